@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+"""
+Offline benchmark of zabbix_check_status.py against the local mock Zabbix API.
+Every scenario starts a mock server with a synthetic inventory, runs the script as a child process and reports
+end-to-end runtime, API requests, bytes transferred and peak RSS of the child.
+
+Examples:
+    ./bench/bench.py --scenario small --scenario medium --latency 0 --latency 20
+    ./bench/bench.py --hosts 2000 --items 100 --repeat 3 -- -b 100 -w 8
+"""
+import argparse
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from mock_zabbix import Inventory, mock_server
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'zabbix_check_status.py')
+# Синтетические инвентари: число узлов сети
+_SCENARIOS = {
+    'small': 100,
+    'medium': 5000,
+    'large': 50000,
+}
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def bench_config(path, url) -> None:
+    with open(path, 'w') as f:
+        f.write("[default]\nzdx_user = bench\nzdx_pass = bench\n\n[bench]\nzdx_host = {}\n".format(url))
+    return None
+
+
+def bench_run(server, config_path, script_args) -> dict:
+    """
+    Run the script once against a started mock server.
+    Peak RSS is taken from wait4() of the child, so every run is measured separately.
+    """
+    server.mock.reset()
+    command = [sys.executable, _SCRIPT, '-c', config_path, '--colorama-disabled'] + script_args
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    runtime = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    with server.mock.lock:
+        counters = copy.deepcopy(server.mock.counters)
+    # __________________________________________________________________________
+    return {'runtime': runtime, 'rc': proc.returncode, 'requests': counters['requests'],
+            'connections': counters['connections'], 'bytes_in': counters['bytes_in'],
+            'bytes_out': counters['bytes_out'], 'methods': counters['methods'],
+            'cpu': rusage.ru_utime + rusage.ru_stime,
+            'max_rss': rusage.ru_maxrss * 1024 if sys.platform != 'darwin' else rusage.ru_maxrss}
+
+
+def bench_scenario(name, hosts, latency, args, config_path) -> list:
+    inventory = Inventory(hosts, args.items, args.triggers, args.lld, args.groups, args.templates,
+                          args.broken_ratio, args.unavailable_ratio, args.seed)
+    server = mock_server(inventory, latency=latency / 1000.0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        bench_config(config_path, "http://{}:{}".format(*server.server_address))
+        results = []
+        for n in range(args.repeat):
+            result = bench_run(server, config_path, args.script_args)
+            result.update({'scenario': name, 'hosts': hosts, 'latency': latency, 'run': n + 1})
+            results.append(result)
+            print("{:<8} {:>7} {:>8} {:>4} {:>9.2f} {:>8.2f} {:>9} {:>6} {:>10.1f} {:>10.1f} {:>9.1f} {:>4}".format(
+                name, hosts, latency, n + 1, result['runtime'], result['cpu'], result['requests'],
+                result['connections'], result['bytes_in'] / 1048576.0, result['bytes_out'] / 1048576.0,
+                result['max_rss'] / 1048576.0, result['rc']), flush=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+    # __________________________________________________________________________
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark zabbix_check_status.py against a local mock Zabbix API',
+        epilog="Arguments after '--' are passed to zabbix_check_status.py")
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(_SCENARIOS), default=None,
+                        help="inventory size: {} (default: small)".format(
+                            ", ".join("{}={}".format(k, v) for k, v in sorted(_SCENARIOS.items(), key=lambda x: x[1]))))
+    parser.add_argument('--hosts', type=int, default=None, help="custom number of hosts (instead of scenarios)")
+    parser.add_argument('--items', type=int, default=50, help="items per host")
+    parser.add_argument('--triggers', type=int, default=20, help="triggers per host")
+    parser.add_argument('--lld', type=int, default=2, help="discovery rules per host")
+    parser.add_argument('--groups', type=int, default=10, help="number of host groups")
+    parser.add_argument('--templates', type=int, default=5, help="number of templates")
+    parser.add_argument('--broken-ratio', type=float, default=0.01, help="ratio of broken objects")
+    parser.add_argument('--unavailable-ratio', type=float, default=0.0, help="ratio of unavailable hosts")
+    parser.add_argument('--latency', type=float, action='append', default=None,
+                        help="injected latency per request, ms (can be repeated, default: 0)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per scenario")
+    parser.add_argument('--json', default=None, metavar='<PATH>', help="write results to a JSON file")
+    parser.add_argument('script_args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.script_args and args.script_args[0] == '--':
+        args.script_args = args.script_args[1:]
+    # __________________________________________________________________________
+    if args.hosts:
+        scenarios = [('custom', args.hosts)]
+    else:
+        scenarios = [(x, _SCENARIOS[x]) for x in (args.scenario or ['small'])]
+    print("{:<8} {:>7} {:>8} {:>4} {:>9} {:>8} {:>9} {:>6} {:>10} {:>10} {:>9} {:>4}".format(
+        "scenario", "hosts", "lat,ms", "run", "time,s", "cpu,s", "requests", "conns", "sent,MiB", "recv,MiB",
+        "rss,MiB", "rc"))
+    results = []
+    with tempfile.TemporaryDirectory(prefix='zcs-bench-') as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'config.ini')
+        for name, hosts in scenarios:
+            for latency in (args.latency or [0.0]):
+                results.extend(bench_scenario(name, hosts, latency, args, config_path))
+    # __________________________________________________________________________
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'script_args': args.script_args, 'results': results}, f, indent=2)
+    return True
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    sys.exit(not main())
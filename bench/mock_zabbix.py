@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+"""
+Local stand-in for Zabbix api_jsonrpc.php serving a synthetic inventory.
+Objects are generated from their ids, so even 50k hosts do not have to be kept in memory.
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ID_RANGE = 100000000
+_ITEM_BASE = 1 * _ID_RANGE
+_TRIGGER_BASE = 2 * _ID_RANGE
+_LLD_BASE = 3 * _ID_RANGE
+_TEMPLATE_ITEM_BASE = 4 * _ID_RANGE
+_TEMPLATE_TRIGGER_BASE = 5 * _ID_RANGE
+_ITEM_ERRORS = ("Unsupported item key.", "Cannot obtain file information: [2] No such file or directory",
+                "Value of type \"string\" is not suitable for value type \"Numeric (unsigned)\"")
+_TRIGGER_ERRORS = ("Cannot evaluate expression: item is not supported.", "Agent is unavailable.",
+                   "Cannot evaluate function: item does not exist.")
+# Поля, которые не используются проверками, но приходят при output: "extend"
+_HOST_AVAILABILITY_FIELDS = ('available', 'snmp_available', 'jmx_available', 'ipmi_available')
+_ITEM_EXTEND_FIELDS = {
+    'type': "0", 'snmp_community': "", 'snmp_oid': "", 'delay': "1m", 'history': "90d", 'trends': "365d",
+    'value_type': "3", 'trapper_hosts': "", 'units': "", 'snmpv3_securityname': "", 'snmpv3_securitylevel': "0",
+    'snmpv3_authpassphrase': "", 'snmpv3_privpassphrase': "", 'formula': "", 'logtimefmt': "", 'valuemapid': "0",
+    'params': "", 'ipmi_sensor': "", 'authtype': "0", 'username': "", 'password': "", 'publickey': "",
+    'privatekey': "", 'flags': "0", 'interfaceid': "1", 'port': "", 'description': "", 'inventory_link': "0",
+    'lifetime': "30d", 'snmpv3_authprotocol': "0", 'snmpv3_privprotocol': "0", 'evaltype': "0",
+    'snmpv3_contextname': "", 'jmx_endpoint': "", 'master_itemid': "0", 'timeout': "3s", 'url': "",
+    'query_fields': [], 'posts': "", 'status_codes': "200", 'follow_redirects': "1", 'post_type': "0",
+    'http_proxy': "", 'headers': [], 'retrieve_mode': "0", 'request_method': "0", 'output_format': "0",
+    'ssl_cert_file': "", 'ssl_key_file': "", 'ssl_key_password': "", 'verify_peer': "0", 'verify_host': "0",
+    'allow_traps': "0", 'lastvalue': "0", 'prevvalue': "0",
+}
+_TRIGGER_EXTEND_FIELDS = {
+    'url': "", 'priority': "2", 'comments': "", 'type': "0", 'recovery_mode': "0", 'recovery_expression': "",
+    'correlation_mode': "0", 'correlation_tag': "", 'manual_close': "0", 'opdata': "", 'flags': "0",
+    'value': "0", 'discover': "0", 'event_name': "", 'uuid': "",
+}
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Inventory(object):
+    def __init__(self, hosts, items_per_host, triggers_per_host, lld_per_host, groups, templates,
+                 broken_ratio, unavailable_ratio, seed):
+        self.hosts_count = hosts
+        self.items_per_host = items_per_host
+        self.triggers_per_host = triggers_per_host
+        self.lld_per_host = lld_per_host
+        self.broken_ratio = broken_ratio
+        self.unavailable_ratio = unavailable_ratio
+        self.seed = seed
+        self.groups = [{'groupid': str(x + 1), 'name': "Group{:02d}".format(x + 1)} for x in range(groups)]
+        self.templates = [{'templateid': str(1000 + x), 'host': "Template {}".format(x + 1),
+                           'name': "Template {}".format(x + 1)} for x in range(templates)]
+        self.status = dict()  # переопределённые через *.update статусы
+        self.hosts = [self._host(x) for x in range(hosts)]
+        self.hosts_by_id = {h['hostid']: h for h in self.hosts}
+
+    def _rand(self, *args):
+        return zlib.crc32("{}:{}".format(self.seed, ":".join(map(str, args))).encode('utf-8')) / 0xffffffff
+
+    def _host(self, x):
+        hostid = str(10001 + x)
+        available = "2" if self._rand('host', hostid) < self.unavailable_ratio else "1"
+        return {'hostid': hostid, 'host': "host-{:05d}".format(x + 1), 'name': "Host {:05d}".format(x + 1),
+                'status': "0" if x % 50 else "1", 'available': available, 'snmp_available': "0",
+                'jmx_available': "0", 'ipmi_available': "0", 'maintenance_status': "1" if x % 97 == 3 else "0",
+                'groupids': [self.groups[x % len(self.groups)]['groupid']] if self.groups else [],
+                '_templateid': self.templates[x % len(self.templates)]['templateid'] if self.templates else "0",
+                'interfaces': [{'interfaceid': str(x + 1), 'type': "1", 'available': available}]}
+
+    def _broken(self, kind, objid):
+        return self._rand(kind, objid) < self.broken_ratio
+
+    def item(self, host, k):
+        itemid = str(_ITEM_BASE + (int(host['hostid']) - 10001) * self.items_per_host + k)
+        broken = self._broken('item', itemid) or host['available'] == "2"
+        templated = host['_templateid'] != "0" and k % 2 == 0
+        item = {'itemid': itemid, 'hostid': host['hostid'], 'name': "Item {} of {}".format(k, host['name']),
+                'key_': "custom.key[{},{}]".format(k, host['host']),
+                'status': self.status.get(itemid, "1" if k % 20 == 19 else "0"),
+                'state': "1" if broken else "0",
+                'error': _ITEM_ERRORS[k % len(_ITEM_ERRORS)] if broken else "",
+                'templateid': str(_TEMPLATE_ITEM_BASE + k) if templated else "0",
+                'lastclock': str(int(time.time()) - k)}
+        item.update(_ITEM_EXTEND_FIELDS)
+        return item
+
+    def trigger(self, host, k):
+        triggerid = str(_TRIGGER_BASE + (int(host['hostid']) - 10001) * self.triggers_per_host + k)
+        broken = self._broken('trigger', triggerid) or host['available'] == "2"
+        templated = host['_templateid'] != "0" and k % 2 == 0
+        trigger = {'triggerid': triggerid, 'description': "Trigger {} on {{HOST.NAME}}".format(k),
+                   'expression': "{{{}}}>0".format(k), 'status': self.status.get(triggerid, "0"),
+                   'state': "1" if broken else "0",
+                   'error': (_TRIGGER_ERRORS[1] if host['available'] == "2" else
+                             _TRIGGER_ERRORS[k % len(_TRIGGER_ERRORS)]) if broken else "",
+                   'templateid': str(_TEMPLATE_TRIGGER_BASE + k) if templated else "0",
+                   'lastchange': str(int(time.time()) - k * 60), '_hostid': host['hostid']}
+        trigger.update(_TRIGGER_EXTEND_FIELDS)
+        return trigger
+
+    def lld_rule(self, host, k):
+        itemid = str(_LLD_BASE + (int(host['hostid']) - 10001) * self.lld_per_host + k)
+        broken = self._broken('lld', itemid)
+        return {'itemid': itemid, 'hostid': host['hostid'], 'name': "Discovery {}".format(k),
+                'key_': "custom.discovery[{}]".format(k), 'status': self.status.get(itemid, "0"),
+                'state': "1" if broken else "0", 'error': "Cannot find the \"data\" array." if broken else "",
+                'templateid': "0", 'delay': "1h", 'lifetime': "30d", 'type': "0"}
+
+    def template_object(self, kind, objid):
+        k = int(objid) - (_TEMPLATE_ITEM_BASE if kind == 'item' else _TEMPLATE_TRIGGER_BASE)
+        if kind == 'item':
+            return {'itemid': objid, 'hostid': self.templates[0]['templateid'] if self.templates else "0",
+                    'name': "Item {} of template".format(k), 'key_': "custom.key[{}]".format(k),
+                    'status': self.status.get(objid, "0"), 'state': "0", 'error': "", 'templateid': "0"}
+        return {'triggerid': objid, 'description': "Trigger {} on {{HOST.NAME}}".format(k),
+                'status': self.status.get(objid, "0"), 'state': "0", 'error': "", 'templateid': "0",
+                '_hostid': self.templates[0]['templateid'] if self.templates else "0"}
+
+
+class MockZabbix(object):
+    def __init__(self, inventory, latency=0.0, token=None, api_version="5.0.0", fail_ratio=0.0):
+        self.inventory = inventory
+        self.latency = latency
+        self.fail_ratio = fail_ratio
+        self.fail_random = random.Random(inventory.seed)
+        self.api_version = api_version
+        self.modern = tuple(int(x) for x in api_version.split('.')[:2]) >= (5, 4)
+        self.tokens = {token} if token else set()
+        self.lock = threading.Lock()
+        self.counters = dict()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {'requests': 0, 'connections': 0, 'bytes_in': 0, 'bytes_out': 0,
+                             'bytes_out_identity': 0, 'methods': dict()}
+
+    def count_connection(self):
+        with self.lock:
+            self.counters['connections'] += 1
+
+    def count(self, method, bytes_in, bytes_out, bytes_out_identity):
+        with self.lock:
+            self.counters['requests'] += 1
+            self.counters['bytes_in'] += bytes_in
+            self.counters['bytes_out'] += bytes_out
+            self.counters['bytes_out_identity'] += bytes_out_identity
+            self.counters['methods'][method] = self.counters['methods'].get(method, 0) + 1
+
+    # __________________________________________________________________________
+    def call(self, request):
+        method, params = str(request.get('method')).lower(), request.get('params') or dict()
+        if method == 'apiinfo.version':
+            return self.api_version
+        if method == 'user.login':
+            token = uuid.uuid4().hex
+            with self.lock:
+                self.tokens.add(token)
+            return token
+        if method == 'user.checkauthentication':
+            if params.get('sessionid', params.get('token')) not in self.tokens:
+                raise MockError(-32602, "Invalid params.", "Session terminated, re-login, please.")
+            return {'sessionid': params.get('sessionid')}
+        if request.get('auth') not in self.tokens:
+            raise MockError(-32602, "Invalid params.", "Not authorised.")
+        if method == 'user.logout':
+            with self.lock:
+                self.tokens.discard(request.get('auth'))
+            return True
+        handler = getattr(self, 'api_' + method.replace('.', '_'), None)
+        if handler is None:
+            raise MockError(-32601, "Method not found.", "Incorrect API \"{}\".".format(method))
+        return handler(params)
+
+    @staticmethod
+    def _ids(value):
+        if value is None:
+            return None
+        return set(map(str, value if isinstance(value, list) else [value]))
+
+    @staticmethod
+    def _match(obj, params):
+        for k, v in (params.get('filter') or dict()).items():
+            values = set(map(str, v)) if isinstance(v, list) else {str(v)}
+            if str(obj.get(k)) not in values:
+                return False
+        for k, v in (params.get('search') or dict()).items():
+            if v and str(v).lower() not in str(obj.get(k, "")).lower():
+                return False
+        return True
+
+    @staticmethod
+    def _output(obj, output):
+        obj = {k: v for k, v in obj.items() if not k.startswith('_')}
+        if output in (None, "extend"):
+            return obj
+        return {k: obj[k] for k in output if k in obj}
+
+    @staticmethod
+    def _finish(rows, params, id_field):
+        if params.get('countOutput'):
+            return str(len(rows))
+        if params.get('sortfield'):
+            field = params['sortfield']
+            # Поле сортировки может отсутствовать в output
+            key = (lambda x: int(x[field])) if field.endswith('id') else (lambda x: x.get(field, ""))
+            rows.sort(key=key, reverse=params.get('sortorder') == "DESC")
+        if params.get('limit'):
+            rows = rows[:int(params['limit'])]
+        return rows
+
+    def _hosts(self, params):
+        hostids = self._ids(params.get('hostids'))
+        groupids = self._ids(params.get('groupids'))
+        for h in self.inventory.hosts:
+            if hostids is not None and h['hostid'] not in hostids:
+                continue
+            if groupids is not None and not groupids & set(h['groupids']):
+                continue
+            yield h
+
+    # __________________________________________________________________________
+    def api_hostgroup_get(self, params):
+        groupids = self._ids(params.get('groupids'))
+        rows = [self._output(g, params.get('output')) for g in self.inventory.groups
+                if (groupids is None or g['groupid'] in groupids) and self._match(g, params)]
+        return self._finish(rows, params, 'groupid')
+
+    def api_host_get(self, params):
+        rows = list()
+        for h in self._hosts(params):
+            if params.get('monitored_hosts') and h['status'] != "0":
+                continue
+            if not self._match(h, params):
+                continue
+            # С Zabbix 5.4 доступность есть только у интерфейсов
+            hidden = ('groupids', 'interfaces') + (_HOST_AVAILABILITY_FIELDS if self.modern else ())
+            row = self._output({k: v for k, v in h.items() if k not in hidden}, params.get('output'))
+            if 'selectGroups' in params:
+                row['groups'] = [self._output(g, params['selectGroups']) for g in self.inventory.groups
+                                 if g['groupid'] in h['groupids']]
+            if 'selectInterfaces' in params:
+                row['interfaces'] = [self._output(x, params['selectInterfaces']) for x in h['interfaces']]
+            # Поддерживается только число объектов узла сети ("count"), как строка
+            for select, key, count in (('selectDiscoveries', 'discoveries', self.inventory.lld_per_host),
+                                       ('selectItems', 'items', self.inventory.items_per_host),
+                                       ('selectTriggers', 'triggers', self.inventory.triggers_per_host)):
+                if params.get(select) == "count":
+                    row[key] = str(count)
+            rows.append(row)
+        return self._finish(rows, params, 'hostid')
+
+    def api_hostinterface_get(self, params):
+        rows = list()
+        for h in self._hosts(params):
+            for x in h['interfaces']:
+                rows.append(self._output(dict(x, hostid=h['hostid']), params.get('output')))
+        return self._finish(rows, params, 'interfaceid')
+
+    def _objects(self, params, kind):
+        ids = self._ids(params.get(kind + 'ids'))
+        for h in self._hosts(params):
+            if (params.get('monitored') or params.get('active')) and h['status'] != "0":
+                continue
+            count = self.inventory.items_per_host if kind == 'item' else self.inventory.triggers_per_host
+            for k in range(count):
+                obj = self.inventory.item(h, k) if kind == 'item' else self.inventory.trigger(h, k)
+                if ids is not None and obj[kind + 'id'] not in ids:
+                    continue
+                if (params.get('monitored') or params.get('active')) and obj['status'] != "0":
+                    continue
+                if params.get('inherited') is True and obj['templateid'] == "0":
+                    continue
+                if self._match(obj, params):
+                    yield h, obj
+        # объекты шаблонов
+        if ids is not None and not params.get('hostids'):
+            base = _TEMPLATE_ITEM_BASE if kind == 'item' else _TEMPLATE_TRIGGER_BASE
+            for objid in sorted(x for x in ids if base <= int(x) < base + _ID_RANGE):
+                obj = self.inventory.template_object(kind, objid)
+                if self._match(obj, params):
+                    yield None, obj
+
+    def api_item_get(self, params):
+        rows = list()
+        for h, i in self._objects(params, 'item'):
+            row = self._output(i, params.get('output'))
+            if 'selectHosts' in params:
+                row['hosts'] = [self._output(h or {'hostid': i['hostid'], 'host': "Template 1",
+                                                   'name': "Template 1"}, params['selectHosts'])]
+            rows.append(row)
+        return self._finish(rows, params, 'itemid')
+
+    def api_trigger_get(self, params):
+        rows = list()
+        for h, t in self._objects(params, 'trigger'):
+            row = self._output(t, params.get('output'))
+            if 'selectFunctions' in params:
+                row['functions'] = [{'functionid': t['triggerid'], 'itemid': "0", 'function': "last",
+                                     'parameter': ""}]
+            if 'selectHosts' in params:
+                row['hosts'] = [self._output(h or {'hostid': t['_hostid'], 'host': "Template 1",
+                                                   'name': "Template 1"}, params['selectHosts'])]
+            rows.append(row)
+        return self._finish(rows, params, 'triggerid')
+
+    def api_discoveryrule_get(self, params):
+        ids = self._ids(params.get('itemids'))
+        rows = list()
+        for h in self._hosts(params):
+            if params.get('monitored') and h['status'] != "0":
+                continue
+            for k in range(self.inventory.lld_per_host):
+                d = self.inventory.lld_rule(h, k)
+                if ids is not None and d['itemid'] not in ids:
+                    continue
+                if self._match(d, params):
+                    rows.append(self._output(d, params.get('output')))
+        return self._finish(rows, params, 'itemid')
+
+    def _update(self, params, id_field):
+        params = params if isinstance(params, list) else [params]
+        with self.lock:
+            for x in params:
+                if 'status' in x:
+                    self.inventory.status[str(x[id_field])] = str(x['status'])
+        return {id_field + 's': [str(x[id_field]) for x in params]}
+
+    def api_item_update(self, params):
+        return self._update(params, 'itemid')
+
+    def api_trigger_update(self, params):
+        return self._update(params, 'triggerid')
+
+
+class MockError(Exception):
+    def __init__(self, code, message, data):
+        super(MockError, self).__init__(data)
+        self.error = {'code': code, 'message': message, 'data': data}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело ответа отправляются отдельно: без TCP_NODELAY задержанное подтверждение клиента добавляет
+    # ~40 мс к каждому запросу через открытое соединение
+    disable_nagle_algorithm = True
+    mock = None
+
+    def setup(self):
+        super(MockHandler, self).setup()
+        self.mock.count_connection()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, body, content_type="application/json"):
+        identity_length = len(body)
+        encoding = self.headers.get('Accept-Encoding', "")
+        self.send_response(200)
+        if 'gzip' in encoding:
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header('Content-Encoding', "gzip")
+        elif 'deflate' in encoding:
+            body = zlib.compress(body, 6)
+            self.send_header('Content-Encoding', "deflate")
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body), identity_length
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.mock.lock:
+                body = json.dumps(self.mock.counters).encode('utf-8')
+            self._send(body)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if self.path.rstrip('/') == '/stats/reset':
+            self.mock.reset()
+            self._send(b"{}")
+            return
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            self.send_error(400)
+            return
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if self.mock.fail_ratio:
+            with self.mock.lock:
+                fail = self.mock.fail_random.random() < self.mock.fail_ratio
+            if fail:
+                self.send_error(503)
+                return
+        response = {'jsonrpc': "2.0", 'id': request.get('id')}
+        try:
+            response['result'] = self.mock.call(request)
+        except MockError as err:
+            response['error'] = err.error
+        sent, identity = self._send(json.dumps(response).encode('utf-8'), "application/json-rpc")
+        self.mock.count(request.get('method'), len(raw), sent, identity)
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def mock_server(inventory, host="127.0.0.1", port=0, latency=0.0, token=None, api_version="5.0.0", fail_ratio=0.0):
+    """
+    Create a threaded mock server. The caller runs serve_forever() and reads the bound port from server_address.
+    fail_ratio: ratio of API requests answered with HTTP 503.
+    """
+    handler = type('Handler', (MockHandler,), {'mock': MockZabbix(inventory, latency=latency, token=token,
+                                                                  api_version=api_version, fail_ratio=fail_ratio)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.mock = handler.mock
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Zabbix JSON-RPC API with a synthetic inventory')
+    parser.add_argument('--listen', default="127.0.0.1", help="listen address")
+    parser.add_argument('--port', type=int, default=8080, help="listen port")
+    parser.add_argument('--hosts', type=int, default=100, help="number of hosts")
+    parser.add_argument('--items', type=int, default=50, help="items per host")
+    parser.add_argument('--triggers', type=int, default=20, help="triggers per host")
+    parser.add_argument('--lld', type=int, default=2, help="discovery rules per host")
+    parser.add_argument('--groups', type=int, default=10, help="number of host groups")
+    parser.add_argument('--templates', type=int, default=5, help="number of templates")
+    parser.add_argument('--broken-ratio', type=float, default=0.01, help="ratio of broken objects")
+    parser.add_argument('--unavailable-ratio', type=float, default=0.0, help="ratio of unavailable hosts")
+    parser.add_argument('--latency', type=float, default=0.0, help="injected latency per request, ms")
+    parser.add_argument('--token', default=None, help="accepted API token")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    parser.add_argument('--api-version', default="5.0.0", help="version returned by apiinfo.version")
+    parser.add_argument('--fail-ratio', type=float, default=0.0, help="ratio of requests answered with HTTP 503")
+    args = parser.parse_args()
+    # __________________________________________________________________________
+    inventory = Inventory(args.hosts, args.items, args.triggers, args.lld, args.groups, args.templates,
+                          args.broken_ratio, args.unavailable_ratio, args.seed)
+    server = mock_server(inventory, args.listen, args.port, args.latency / 1000.0, args.token, args.api_version,
+                         args.fail_ratio)
+    print("Listening on http://{}:{}/api_jsonrpc.php".format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return True
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    main()
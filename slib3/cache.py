@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+
+from .codec import codec
+from .log import log
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Cache(object):
+    """
+    Results of slow-changing API methods of one server on disk: a file per request "<key>.json".
+    The key is a hash of the server (url, user, token), the method and params (sorted keys).
+    ttl: {method: seconds}, methods not listed or with ttl 0 are not cached.
+    Files are written atomically, the oldest used files are removed when the directory exceeds max_size bytes.
+    The size of the directory is counted once and then tracked by put(), so the directory is scanned only to evict.
+    refresh: results are requested from the server and written to the cache, the cache is not read.
+    """
+
+    def __init__(self, path, server, ttl, max_size=64 * 1024 * 1024, refresh=False):
+        self.path = path
+        self.server = server
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        # Размер каталога, None - не подсчитан (подсчитывается при первой записи)
+        self.__size = None
+
+    def enabled(self, method) -> bool:
+        return bool(self.ttl.get(method))
+
+    def file(self, method, params) -> str:
+        data = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        key = hashlib.sha256("{}\0{}\0{}".format(self.server, method, data).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, method, params):
+        """
+        Cached result of the request or None if it is not cached or expired.
+        """
+        if not self.enabled(method) or self.refresh:
+            return None
+        path = self.file(method, params)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = codec.loads(data)
+            if time.time() - entry['time'] < self.ttl[method]:
+                # Время изменения файла - время последнего использования для вытеснения
+                os.utime(path)
+                with self.__lock:
+                    self.hits += 1
+                log.d2("Cache hit :: {} :: {}".format(method, path))
+                return entry['result']
+            os.remove(path)
+            self.__track(-len(data))
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            log.w("Cache entry is ignored :: {} :: {}".format(path, err))
+        # ______________________________________________________________________
+        with self.__lock:
+            self.misses += 1
+        return None
+
+    def put(self, method, params, result) -> bool:
+        if not self.enabled(method):
+            return False
+        path = self.file(method, params)
+        tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            data = codec.dumps({'time': time.time(), 'method': method, 'result': result})
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+            self.__track(len(data) - replaced)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+        # ______________________________________________________________________
+        log.d2("Cached :: {} :: {}".format(method, path))
+        return True
+
+    def __track(self, delta) -> None:
+        """
+        Add delta bytes to the size of the directory, evict() when it is not counted yet or exceeds max_size.
+        """
+        with self.__lock:
+            if self.__size is not None:
+                self.__size += delta
+            full = self.__size is None or self.__size > self.max_size
+        if full:
+            self.evict()
+        return None
+
+    def evict(self) -> None:
+        """
+        Count the size of the directory, if it is larger than max_size remove the least recently used files
+        down to 90% of max_size: the next files are written without a scan.
+        Other processes sharing the directory are taken into account by the next scan.
+        """
+        with self.__lock:
+            entries = list()
+            for x in os.scandir(self.path):
+                if x.name.endswith('.json') and x.is_file():
+                    stat = x.stat()
+                    entries.append((stat.st_mtime, stat.st_size, x.path))
+            size = sum(x[1] for x in entries)
+            if size > self.max_size:
+                for _, file_size, path in sorted(entries):
+                    if size <= self.max_size * 0.9:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    size -= file_size
+                    log.d2("Cache evicted :: {}".format(path))
+            self.__size = size
+        return None
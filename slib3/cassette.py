@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import gzip
+import hashlib
+import json
+import os
+import threading
+import traceback
+
+from .log import log
+
+_CREDENTIALS = ('user', 'username', 'password')
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Cassette(object):
+    """
+    Recorded API traffic of one server: a gzip file with a line per response "<key>\\t<method>\\t<response json>".
+    The key is a hash of the method and params (auth and id are not included, neither are the credentials of
+    user.login), request params are not stored.
+    Identical requests are answered in the order they were recorded, the last response is repeated after that.
+    """
+
+    def __init__(self, path, replay=False):
+        self.path = path
+        self.replay = replay
+        self.__lock = threading.Lock()
+        self.__file = None
+        self.__index = dict()
+        self.__cursor = dict()
+
+    def open(self) -> bool:
+        if self.replay and not os.path.isfile(self.path):
+            log.e("Recorded responses not found: '{}'".format(self.path))
+            return False
+        try:
+            if self.replay:
+                with gzip.open(self.path, 'rb') as f:
+                    for line in f:
+                        key, _, data = line.rstrip(b'\n').split(b'\t', 2)
+                        self.__index.setdefault(key.decode('ascii'), []).append(data)
+            else:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self.__file = gzip.open(self.path, 'wb')
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+        # ______________________________________________________________________
+        log.d1("Cassette {} :: {}".format("replay" if self.replay else "record", self.path))
+        return True
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+        return None
+
+    @staticmethod
+    def key(json_obj):
+        obj = json.loads(json_obj)
+        params = obj.get('params')
+        # Пароль не должен попадать в файл даже в виде хеша: его легко подобрать по словарю
+        if obj.get('method') == 'user.login' and isinstance(params, dict):
+            params = {k: v for k, v in params.items() if k not in _CREDENTIALS}
+        params = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return obj.get('method'), hashlib.sha1("{}\0{}".format(obj.get('method'), params).encode('utf-8')).hexdigest()
+
+    def get(self, json_obj):
+        """
+        Recorded response (bytes) to the request or None.
+        """
+        _, key = self.key(json_obj)
+        with self.__lock:
+            responses = self.__index.get(key)
+            if not responses:
+                return None
+            n = self.__cursor.get(key, 0)
+            self.__cursor[key] = n + 1
+            return responses[min(n, len(responses) - 1)]
+
+    def put(self, json_obj, data) -> None:
+        method, key = self.key(json_obj)
+        # Переводы строк вне строковых значений JSON не значимы, внутри строк они экранированы
+        line = b"\t".join((key.encode('ascii'), str(method).encode('utf-8'),
+                           data.replace(b'\r', b' ').replace(b'\n', b' '))) + b'\n'
+        with self.__lock:
+            self.__file.write(line)
+        return None
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def cassette_path(directory, section, url):
+    """
+    File of the config section: sections of one server select other hosts and make other requests.
+    """
+    key = "{}\0{}".format(section, url.rstrip('/'))
+    return os.path.join(directory, hashlib.sha256(key.encode('utf-8')).hexdigest()[:16] + '.jsonl.gz')
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import json
+
+# Необязательные модули импортируются явно, чтобы их находила сборка cx_Freeze (2exe.py)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+_MODULES = {'orjson': orjson, 'simplejson': simplejson, 'json': json}
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Codec(object):
+    """
+    JSON backend of the API client: requests are encoded to bytes, responses are decoded from the bytes-like buffer
+    as received.
+    The fastest installed backend is used by default: orjson, simplejson, json.
+    """
+    BACKENDS = ('orjson', 'simplejson', 'json')
+
+    def __init__(self):
+        self.name = None
+        self.loads = None
+        self.dumps = None
+        self.setup('auto')
+
+    def setup(self, name) -> bool:
+        """
+        name: 'auto' or one of BACKENDS. Returns False if the backend is not installed, the current one is kept.
+        """
+        for backend in (self.BACKENDS if name == 'auto' else (name,)):
+            module = _MODULES.get(backend)
+            if module is None:
+                continue
+            if backend == 'orjson':
+                self.loads, self.dumps = module.loads, module.dumps
+            else:
+                # Компактный JSON без экранирования не-ASCII символов, как у orjson; ответ может быть bytearray
+                self.loads = lambda data, _loads=module.loads: _loads(
+                    data if isinstance(data, str) else data.decode('utf-8'))
+                self.dumps = lambda obj, _dumps=module.dumps: _dumps(
+                    obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.name = backend
+            return True
+        return False
+
+
+# ======================================================================================================================
+# Objects
+# ======================================================================================================================
+codec = Codec()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import re
+
+# Глобальный встроенный флаг, например (?i): в объединенном выражении действовал бы на все шаблоны
+# (до Python 3.11 не в начале выражения это только предупреждение, а не re.error)
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+# Ссылка на группу по номеру (\1, (?(1)...)): в объединенном выражении номера групп сдвигаются
+_GROUP_REFS = re.compile(r"(?:^|[^\\])(?:\\\\)*\\[1-9]|\(\?\(\d")
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Exclusions(object):
+    """
+    Exclusion rules of one object type compiled once per server: a set of ids, regular expressions of the
+    key/description combined into one expression and fragments of the error message matched case-insensitively
+    by one expression. The cost of a check does not depend on the number of ids.
+    """
+
+    def __init__(self, ids=(), patterns=(), errors=()):
+        self.ids = set(ids)
+        self.regex = exclude_compile(patterns)
+        self.errors = re.compile("|".join(map(re.escape, errors)), re.IGNORECASE) if errors else None
+
+    def match(self, objectid, text, error="") -> bool:
+        if int(objectid) in self.ids:
+            return True
+        if self.regex is not None and self.regex.search(text):
+            return True
+        if self.errors is not None and self.errors.search(error):
+            return True
+        return False
+
+
+class _RegexList(object):
+    """
+    Patterns that can not be combined (global inline flags, group references by number), searched one by one.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [re.compile(x) for x in patterns]
+
+    def search(self, text):
+        for x in self.patterns:
+            m = x.search(text)
+            if m:
+                return m
+        return None
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def exclude_compile(patterns):
+    """
+    One expression for all the patterns or None. re.error is raised for an invalid pattern.
+    Patterns with global inline flags or group references by number are not combined.
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    for x in patterns:
+        re.compile(x)
+    if len(patterns) == 1:
+        return re.compile(patterns[0])
+    if any(_GLOBAL_FLAGS.search(x) or _GROUP_REFS.search(x) for x in patterns):
+        return _RegexList(patterns)
+    try:
+        return re.compile("|".join("(?:{})".format(x) for x in patterns))
+    except re.error:
+        return _RegexList(patterns)
+
+
+def exclude_ids(value):
+    """
+    Integer ids from a list separated by spaces, other words are ignored.
+    """
+    return {int(x) for x in value.split() if x.isdigit()}
+
+
+def exclude_lines(value):
+    """
+    Non-empty lines of a multi-line parameter.
+    """
+    return [x.strip() for x in value.splitlines() if x.strip()]
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import contextlib
+import random
+import threading
+import time
+
+from .log import log
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Guard(object):
+    """
+    Call policy of one server: retries with exponential backoff and full jitter within the deadline of a call,
+    limits of concurrent requests and requests per second, and a circuit breaker.
+    The breaker opens after breaker_threshold (0 - never) consecutive failed requests, calls are rejected without
+    a request for breaker_cooldown seconds, then one trial request is let through: success closes the breaker.
+    The trial belongs to the thread that was let through, it ends with success(), failure() or release().
+    Counters are cumulative, counts() is compared by the caller.
+    """
+
+    def __init__(self, attempts=3, backoff=1.0, backoff_max=30.0, timeout=29.0, deadline=120.0, concurrency=0,
+                 rate=0.0, breaker_threshold=5, breaker_cooldown=60.0):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self.__lock = threading.Lock()
+        self.__semaphore = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.__interval = 1.0 / rate if rate else 0.0
+        self.__next_request = 0.0
+        self.__consecutive = 0
+        self.__open_until = None
+        self.__trial = None
+
+    def counts(self) -> dict:
+        with self.__lock:
+            return {'retries': self.retries, 'failures': self.failures, 'rejected': self.rejected,
+                    'trips': self.trips}
+
+    def delay(self, attempt) -> float:
+        """
+        Pause before the next attempt: random up to backoff * 2^(attempt - 1), not more than backoff_max.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+    def allow(self) -> bool:
+        """
+        False while the breaker is open; after the cooldown only one trial request is allowed at a time.
+        """
+        with self.__lock:
+            if self.__open_until is None:
+                return True
+            if time.monotonic() >= self.__open_until and self.__trial is None:
+                self.__trial = threading.get_ident()
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self.__lock:
+            self.__consecutive = 0
+            if self.__open_until is not None:
+                log.i("Circuit breaker closed")
+            self.__open_until = None
+            self.__trial = None
+        return None
+
+    def failure(self) -> None:
+        with self.__lock:
+            self.failures += 1
+            self.__consecutive += 1
+            if self.__trial is not None or self.__open_until is None and self.breaker_threshold and \
+                    self.__consecutive >= self.breaker_threshold:
+                self.trips += 1
+                self.__open_until = time.monotonic() + self.breaker_cooldown
+                self.__trial = None
+                log.w("Circuit breaker open :: consecutive failures: {}, cooldown: {}s".format(
+                    self.__consecutive, self.breaker_cooldown))
+        return None
+
+    def release(self) -> None:
+        """
+        End the trial of the current thread without a result (the request was not made or not answered by the API),
+        the next call after the cooldown is the trial.
+        """
+        with self.__lock:
+            if self.__trial == threading.get_ident():
+                self.__trial = None
+        return None
+
+    def retry(self) -> None:
+        with self.__lock:
+            self.retries += 1
+        return None
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Wait for a free request slot and the request rate.
+        """
+        if self.__semaphore is not None:
+            self.__semaphore.acquire()
+        try:
+            if self.__interval:
+                with self.__lock:
+                    now = time.monotonic()
+                    wait = max(0.0, self.__next_request - now)
+                    self.__next_request = max(now, self.__next_request) + self.__interval
+                if wait:
+                    time.sleep(wait)
+            yield
+        finally:
+            if self.__semaphore is not None:
+                self.__semaphore.release()
@@ -16,3 +16,19 @@ def kb_confirm(msg):
         return True
     else:
         return False
+
+
+def kb_choice(msg, choices, default=None):
+    """
+    choices: {answer: description}. The question is repeated until one of the answers is given,
+    default is returned at the end of input.
+    """
+    while True:
+        log.r("{}\n    {}".format(msg, "  ".join("[{}] {}".format(k, v) for k, v in choices.items())))
+        sys.stdout.flush()
+        try:
+            answer = input('$:').strip().lower()
+        except EOFError:
+            return default
+        if answer in choices:
+            return answer
@@ -2,6 +2,7 @@
 # 26.08.2020
 # ----------------------------------------------------------------------------------------------------------------------
 import logging
+import logging.handlers
 import os
 import sys
 
@@ -23,54 +24,41 @@ _WARNING = logging.WARNING
 _ERROR = logging.ERROR
 _CRITICAL = logging.CRITICAL
 _REQUEST = logging.CRITICAL + 1
+# Цвета уровней: строки собираются один раз
+_COLORS = {
+    _DEBUG2: colorama.Style.DIM + colorama.Fore.WHITE,
+    _DEBUG1: colorama.Style.DIM + colorama.Fore.WHITE,
+    _INFO: colorama.Fore.LIGHTWHITE_EX,
+    _OK: colorama.Fore.GREEN,
+    _SEPARATOR: colorama.Fore.LIGHTBLUE_EX,
+    _WARNING: colorama.Fore.YELLOW,
+    _ERROR: colorama.Fore.RED,
+    _CRITICAL: colorama.Fore.LIGHTRED_EX,
+    _REQUEST: colorama.Fore.MAGENTA,
+} if _COLORAMA_INIT else dict()
 
 
 # ======================================================================================================================
 # Classes
 # ======================================================================================================================
 class CustomFormatter(logging.Formatter):
+    """
+    The level name and the message are colored by the level. Only emitted records are formatted, the record is
+    restored after formatting, so other handlers get it unchanged.
+    """
+
     def format(self, record):
-        if _COLORAMA_INIT and log.colorama_enabled:
-            # debug2
-            if record.levelno == _DEBUG2:
-                record.levelname = colorama.Style.DIM + colorama.Fore.WHITE + record.levelname + \
-                                   colorama.Style.RESET_ALL
-                record.msg = colorama.Style.DIM + colorama.Fore.WHITE + record.msg + colorama.Style.RESET_ALL
-            # debug1
-            elif record.levelno == _DEBUG1:
-                record.levelname = colorama.Style.DIM + colorama.Fore.WHITE + record.levelname + \
-                                   colorama.Style.RESET_ALL
-                record.msg = colorama.Style.DIM + colorama.Fore.WHITE + record.msg + colorama.Style.RESET_ALL
-            # info
-            elif record.levelno == _INFO:
-                record.levelname = colorama.Fore.LIGHTWHITE_EX + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.LIGHTWHITE_EX + record.msg + colorama.Style.RESET_ALL
-            # ok
-            elif record.levelno == _OK:
-                record.levelname = colorama.Fore.GREEN + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.GREEN + record.msg + colorama.Style.RESET_ALL
-            # separator
-            elif record.levelno == _SEPARATOR:
-                record.levelname = colorama.Fore.LIGHTBLUE_EX + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.LIGHTBLUE_EX + record.msg + colorama.Style.RESET_ALL
-            # warning
-            elif record.levelno == _WARNING:
-                record.levelname = colorama.Fore.YELLOW + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.YELLOW + record.msg + colorama.Style.RESET_ALL
-            # error
-            elif record.levelno == _ERROR:
-                record.levelname = colorama.Fore.RED + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.RED + record.msg + colorama.Style.RESET_ALL
-            # critical
-            elif record.levelno == _CRITICAL:
-                record.levelname = colorama.Fore.LIGHTRED_EX + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.LIGHTRED_EX + record.msg + colorama.Style.RESET_ALL
-            # request
-            elif record.levelno == _REQUEST:
-                record.levelname = colorama.Fore.MAGENTA + record.levelname + colorama.Style.RESET_ALL
-                record.msg = colorama.Fore.MAGENTA + record.msg + colorama.Style.RESET_ALL
+        color = _COLORS.get(record.levelno) if _COLORAMA_INIT and log.colorama_enabled else None
+        if color is None:
+            return super(CustomFormatter, self).format(record)
         # ______________________________________________________________________
-        return super(CustomFormatter, self).format(record)
+        levelname, msg = record.levelname, record.msg
+        record.levelname = color + levelname + colorama.Style.RESET_ALL
+        record.msg = color + str(msg) + colorama.Style.RESET_ALL
+        try:
+            return super(CustomFormatter, self).format(record)
+        finally:
+            record.levelname, record.msg = levelname, msg
 
 
 class CustomLogger(object):
@@ -109,6 +97,18 @@ class CustomLogger(object):
             self.logger.setLevel(kwargs['level'])
         if 'colorama_enabled' in kwargs:
             self.colorama_enabled = kwargs['colorama_enabled']
+        if 'stream' in kwargs:
+            self.logger.handlers[0].setStream(kwargs['stream'])
+        if 'file' in kwargs:
+            # Файл с ротацией по размеру вместо потока вывода
+            handler = logging.handlers.RotatingFileHandler(kwargs['file'], maxBytes=kwargs.get('max_bytes', 0),
+                                                           backupCount=kwargs.get('backup_count', 0),
+                                                           encoding='utf-8')
+            handler.setFormatter(self.logger.handlers[0].formatter)
+            old = self.logger.handlers[0]
+            self.logger.removeHandler(old)
+            old.close()
+            self.logger.addHandler(handler)
         if 'datetime_enabled' in kwargs:
             if kwargs['datetime_enabled']:
                 self.logger.handlers[0].setFormatter(
@@ -140,6 +140,12 @@ class CustomLogger(object):
         # ______________________________________________________________________
         return d.get(os.environ.get('LOG_DATETIME', "").lower(), False)
 
+    def is_enabled(self, level) -> bool:
+        """
+        True if messages of the level are emitted, used to skip building expensive messages.
+        """
+        return self.logger.isEnabledFor(level)
+
     def d2(self, message, *args, **kwargs):
         self.logger.log(_DEBUG2, message, *args, **kwargs)
 
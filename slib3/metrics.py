@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import threading
+import time
+import traceback
+
+from .log import log
+
+_PREFIX = "zabbix_check_status_"
+# Имя, тип и описание метрик в порядке вывода
+_METRICS = (
+    ('broken_objects', 'gauge', "Broken objects of the host by type"),
+    ('excluded_objects', 'gauge', "Broken objects of the host excluded by the configuration"),
+    ('group_broken_objects', 'gauge', "Broken objects of the hosts of the host group by type"),
+    ('group_excluded_objects', 'gauge', "Excluded broken objects of the hosts of the host group by type"),
+    ('objects', 'gauge', "Monitored objects of the checked hosts by type"),
+    ('host_objects', 'gauge', "Objects of the host by type, disabled included (up to metrics_max_hosts hosts)"),
+    ('scan_duration_seconds', 'gauge', "Duration of the last scan of the server"),
+    ('scan_success', 'gauge', "1 if the last scan of the server finished without API errors"),
+    ('last_scan_timestamp_seconds', 'gauge', "Time the last scan of the server finished"),
+    ('api_requests_total', 'counter', "API requests by method"),
+    ('api_errors_total', 'counter', "Failed API requests by method"),
+)
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Metrics(object):
+    """
+    Results of the last scan per server in the Prometheus text format.
+    Object gauges are replaced by every scan of the server, API counters are accumulated.
+    Only --metrics-file/--metrics-listen enable it; in a parallel run the scans of worker processes replace
+    the scans of their servers in the parent.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.__lock = threading.Lock()
+        self.servers = dict()
+        self.api = dict()
+
+    def setup(self, enabled) -> None:
+        self.enabled = enabled
+        return None
+
+    def scan_begin(self, server) -> None:
+        if not self.enabled:
+            return None
+        with self.__lock:
+            self.servers[server] = {'objects': dict(), 'groups': dict(), 'totals': dict(), 'host_totals': dict(),
+                                    'duration': 0.0, 'success': 0, 'timestamp': 0.0}
+        return None
+
+    def scan_end(self, server, duration, calls, failed=False) -> None:
+        """
+        calls: {method: (requests, errors)} made by the scan.
+        failed: the scan did not take place (e.g. the server is not connected).
+        """
+        if not self.enabled:
+            return None
+        with self.__lock:
+            scan = self.servers.setdefault(server, {'objects': dict(), 'groups': dict(), 'totals': dict(),
+                                                    'host_totals': dict()})
+            scan.update({'duration': duration, 'timestamp': time.time(),
+                         'success': int(not failed and not sum(x[1] for x in calls.values()))})
+            for method, (requests, errors) in calls.items():
+                counter = self.api.setdefault((server, method), [0, 0])
+                counter[0] += requests
+                counter[1] += errors
+        return None
+
+    def add_object(self, server, host, groups, kind, excluded=False) -> None:
+        if not self.enabled:
+            return None
+        n = int(bool(excluded))
+        with self.__lock:
+            scan = self.servers[server]
+            scan['objects'].setdefault((host, kind), [0, 0])[n] += 1
+            for group in groups:
+                scan['groups'].setdefault((group, kind), [0, 0])[n] += 1
+        return None
+
+    def set_total(self, server, kind, value) -> None:
+        if not self.enabled:
+            return None
+        with self.__lock:
+            self.servers[server]['totals'][kind] = value
+        return None
+
+    def set_host_total(self, server, host, kind, value) -> None:
+        if not self.enabled:
+            return None
+        with self.__lock:
+            self.servers[server]['host_totals'][(host, kind)] = value
+        return None
+
+    def dump(self) -> dict:
+        with self.__lock:
+            return {'servers': {k: dict(v, objects=list(v['objects'].items()), groups=list(v['groups'].items()),
+                                        host_totals=list(v['host_totals'].items()))
+                                for k, v in self.servers.items()},
+                    'api': list(self.api.items())}
+
+    def merge(self, data) -> None:
+        with self.__lock:
+            for server, scan in data['servers'].items():
+                self.servers[server] = dict(scan, objects={tuple(k): v for k, v in scan['objects']},
+                                            groups={tuple(k): v for k, v in scan['groups']},
+                                            host_totals={tuple(k): v for k, v in scan['host_totals']})
+            for key, (requests, errors) in data['api']:
+                counter = self.api.setdefault(tuple(key), [0, 0])
+                counter[0] += requests
+                counter[1] += errors
+        return None
+
+    @staticmethod
+    def _labels(**kwargs):
+        return ",".join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                        for k, v in kwargs.items())
+
+    def render(self) -> str:
+        samples = {x[0]: [] for x in _METRICS}
+        with self.__lock:
+            for server, scan in sorted(self.servers.items()):
+                for (host, kind), (broken, excluded) in sorted(scan['objects'].items()):
+                    samples['broken_objects'].append((self._labels(server=server, host=host, type=kind), broken))
+                    samples['excluded_objects'].append((self._labels(server=server, host=host, type=kind), excluded))
+                for (group, kind), (broken, excluded) in sorted(scan['groups'].items()):
+                    labels = self._labels(server=server, group=group, type=kind)
+                    samples['group_broken_objects'].append((labels, broken))
+                    samples['group_excluded_objects'].append((labels, excluded))
+                for kind, value in sorted(scan['totals'].items()):
+                    samples['objects'].append((self._labels(server=server, type=kind), value))
+                for (host, kind), value in sorted(scan['host_totals'].items()):
+                    samples['host_objects'].append((self._labels(server=server, host=host, type=kind), value))
+                if scan.get('timestamp'):
+                    labels = self._labels(server=server)
+                    samples['scan_duration_seconds'].append((labels, round(scan['duration'], 3)))
+                    samples['scan_success'].append((labels, scan['success']))
+                    samples['last_scan_timestamp_seconds'].append((labels, round(scan['timestamp'], 3)))
+            for (server, method), (requests, errors) in sorted(self.api.items()):
+                samples['api_requests_total'].append((self._labels(server=server, method=method), requests))
+                samples['api_errors_total'].append((self._labels(server=server, method=method), errors))
+        # ______________________________________________________________________
+        lines = []
+        for name, kind, description in _METRICS:
+            lines.append("# HELP {}{} {}".format(_PREFIX, name, description))
+            lines.append("# TYPE {}{} {}".format(_PREFIX, name, kind))
+            lines.extend("{}{}{{{}}} {}".format(_PREFIX, name, labels, value) for labels, value in samples[name])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path) -> bool:
+        """
+        Write the textfile collector file atomically.
+        """
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(path + '.tmp', path)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+        # ______________________________________________________________________
+        log.d2("Metrics written :: {}".format(path))
+        return True
+
+    def serve(self, address):
+        """
+        Serve /metrics over HTTP in a background thread. address: "[host:]port".
+        Returns the server (stopped by shutdown()) or None.
+        """
+        # ThreadingHTTPServer появился в Python 3.7, импорт только для режима с HTTP
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        host, _, port = address.rpartition(':')
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0].rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                log.d2("Metrics request :: {}".format(fmt % args))
+
+        try:
+            server = ThreadingHTTPServer((host or "0.0.0.0", int(port)), Handler)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        log.i("Metrics endpoint :: http://{}:{}/metrics".format(*server.server_address))
+        return server
+
+
+# ======================================================================================================================
+# Objects
+# ======================================================================================================================
+metrics = Metrics()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import collections
+import concurrent.futures
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def pool_imap(func, iterable, workers=1):
+    """
+    Ordered map over a thread pool.
+    Results are yielded in the order of the input, at most 2 * workers calls are running or waiting for the consumer.
+    """
+    if workers <= 1:
+        for x in iterable:
+            yield func(x)
+        return
+    # __________________________________________________________________________
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = collections.deque()
+        for x in iterable:
+            futures.append(executor.submit(func, x))
+            if len(futures) >= workers * 2:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import sys
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Item(object):
+    """
+    Fields of an item used by the checks, built from an API object: ids, status and state are integers,
+    error messages are interned (the same few messages repeat over thousands of objects).
+    templateid - parent template item, 0 if the item is not inherited or the field is not requested.
+    """
+    __slots__ = ('itemid', 'hostid', 'name', 'key_', 'error', 'status', 'state', 'templateid')
+
+    def __init__(self, obj):
+        self.itemid = int(obj['itemid'])
+        self.hostid = int(obj['hostid'])
+        self.name = obj['name']
+        self.key_ = obj['key_']
+        self.error = sys.intern(obj['error'])
+        self.status = int(obj['status'])
+        self.state = int(obj['state'])
+        self.templateid = int(obj.get('templateid', 0))
+
+
+class LLDRule(Item):
+    """
+    Fields of a discovery rule, the same as of an item.
+    """
+    __slots__ = ()
+
+
+class Trigger(object):
+    """
+    Fields of a trigger used by the checks, hostids - hosts of the trigger functions,
+    templateid - parent template trigger or 0.
+    """
+    __slots__ = ('triggerid', 'description', 'error', 'status', 'state', 'templateid', 'hostids')
+
+    def __init__(self, obj):
+        self.triggerid = int(obj['triggerid'])
+        self.description = obj['description']
+        self.error = sys.intern(obj['error'])
+        self.status = int(obj['status'])
+        self.state = int(obj['state'])
+        self.templateid = int(obj.get('templateid', 0))
+        self.hostids = tuple(int(h['hostid']) for h in obj.get('hosts', ()))
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def records_consume(objects):
+    """
+    Iterate over API objects; an object of a list is released as soon as it is taken, so the records built from the
+    objects do not add to the memory held by the whole decoded response.
+    """
+    if isinstance(objects, list):
+        for n in range(len(objects)):
+            obj, objects[n] = objects[n], None
+            yield obj
+    else:
+        yield from objects
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+from .kb import kb_choice
+from .log import log
+from .zabbix import zabbix_item_update, zabbix_trigger_update
+
+# Функция обновления и поле id по типу объекта
+_UPDATE = {
+    'item': (zabbix_item_update, 'itemid'),
+    'trigger': (zabbix_trigger_update, 'triggerid'),
+}
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Remediation(object):
+    """
+    Broken items and triggers selected for disabling on one server, sent by item.update/trigger.update with
+    an array of up to chunk_size objects per call.
+    Objects are selected by the auto-disable rules (Exclusions by type) or confirmed interactively; the answers
+    "all matching on this host/server" select the following objects of the same type with the same error.
+    Template objects (rollup) are selected separately from the objects of hosts and only interactively,
+    the auto-disable rules are never applied to them.
+    """
+
+    def __init__(self, zabbix_server, chunk_size=100, interactive=False, auto=None):
+        self.zabbix_server = zabbix_server
+        self.chunk_size = chunk_size
+        self.interactive = interactive
+        self.auto = auto or dict()
+        self.queue = {kind: [] for kind in _UPDATE}
+        self.disabled = {kind: 0 for kind in _UPDATE}
+        self.failed = {kind: 0 for kind in _UPDATE}
+        self.chunks = 0
+        self.__server_rules = set()
+        self.__host_rules = set()
+        self.__host_counts = dict()
+
+    def host_begin(self, items=(), triggers=()) -> None:
+        """
+        Start the checks of a host: number of broken objects by type and error, answers for the host are reset.
+        """
+        self.__host_rules = set()
+        self.__host_counts = dict()
+        for kind, objects in (('item', items), ('trigger', triggers)):
+            for x in objects:
+                if x.status == 0 and x.state == 1:
+                    key = (kind, x.error, False)
+                    self.__host_counts[key] = self.__host_counts.get(key, 0) + 1
+        return None
+
+    def select(self, kind, objectid, text, error, info_str, template=False) -> bool:
+        """
+        True if the broken object is queued for disabling.
+        text: key of the item or description of the trigger matched by the auto-disable rules.
+        template: the object is a template item/trigger, disabling it disables the inherited objects of all hosts.
+        """
+        key = (kind, error, template)
+        if not template and kind in self.auto and self.auto[kind].match(objectid, text, error):
+            log.d1("Auto-disable: {}".format(info_str))
+        elif key in self.__host_rules or key in self.__server_rules:
+            log.d1("Disable (matching): {}".format(info_str))
+        elif self.interactive:
+            choices = {'y': "yes", 'n': "no"}
+            if not template:
+                choices['h'] = "all {} matching on this host".format(self.__host_counts.get(key, 1))
+            choices['s'] = "all matching on this server"
+            answer = kb_choice("Disable {}{}: {}".format("template " if template else "", kind, info_str), choices,
+                               default='n')
+            if answer == 'n':
+                return False
+            if answer == 'h':
+                self.__host_rules.add(key)
+            elif answer == 's':
+                self.__server_rules.add(key)
+        else:
+            return False
+        # ______________________________________________________________________
+        self.queue[kind].append(int(objectid))
+        if len(self.queue[kind]) >= self.chunk_size:
+            self.send(kind)
+        return True
+
+    def send(self, kind) -> bool:
+        """
+        Disable the queued objects of the type, one update call per chunk.
+        """
+        return_value = True
+        update, id_field = _UPDATE[kind]
+        while self.queue[kind]:
+            chunk, self.queue[kind] = self.queue[kind][:self.chunk_size], self.queue[kind][self.chunk_size:]
+            self.chunks += 1
+            if update(self.zabbix_server, [{id_field: x, 'status': 1} for x in chunk]) is not None:
+                self.disabled[kind] += len(chunk)
+                log.o("Disabled {}s :: chunk {}: {}".format(kind, self.chunks, len(chunk)))
+            else:
+                self.failed[kind] += len(chunk)
+                log.e("Failed to disable {}s :: chunk {}: {}".format(kind, self.chunks, len(chunk)))
+                log.d1("... {}s: {}".format(id_field, " ".join(map(str, chunk))))
+                return_value = False
+        return return_value
+
+    def flush(self) -> bool:
+        """
+        Send the rest of the queue. False if any chunk of the server failed.
+        """
+        for kind in _UPDATE:
+            self.send(kind)
+        if sum(self.disabled.values()) or sum(self.failed.values()):
+            log.i("Disabled :: items: {}, triggers: {}, failed: {}".format(
+                self.disabled['item'], self.disabled['trigger'], sum(self.failed.values())))
+        return not sum(self.failed.values())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import csv
+import json
+import sys
+import threading
+
+_FIELDS = ('server', 'host', 'hostid', 'type', 'id', 'name', 'key', 'error', 'excluded', 'recovered', 'skipped')
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Reporter(object):
+    """
+    Machine-readable results: a record per broken object or skipped host (type 'host') written to the stream
+    as soon as it is found.
+    format: 'text' (records are not written, results are logged), 'jsonl' or 'csv'.
+    """
+
+    def __init__(self):
+        self.format = 'text'
+        self.stream = sys.stdout
+        self.header = True
+        self.__lock = threading.Lock()
+
+    def setup(self, **kwargs) -> None:
+        """
+        header: False if the CSV header is already written by another process.
+        """
+        if 'format' in kwargs:
+            self.format = kwargs['format']
+        if 'stream' in kwargs:
+            self.stream = kwargs['stream']
+        if 'header' in kwargs:
+            self.header = kwargs['header']
+        return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.format != 'text'
+
+    def _header(self) -> None:
+        if self.header and self.format == 'csv':
+            csv.writer(self.stream, lineterminator='\n').writerow(_FIELDS)
+        self.header = False
+
+    def write(self, record_fields) -> None:
+        record = dict({x: "" for x in _FIELDS}, excluded=False, recovered=False, skipped=False)
+        record.update(record_fields)
+        with self.__lock:
+            self._header()
+            if self.format == 'jsonl':
+                self.stream.write(json.dumps({x: record[x] for x in _FIELDS}, ensure_ascii=False) + '\n')
+            elif self.format == 'csv':
+                csv.writer(self.stream, lineterminator='\n').writerow(
+                    [str(record[x]).lower() if isinstance(record[x], bool) else record[x] for x in _FIELDS])
+        return None
+
+    def write_raw(self, text) -> None:
+        """
+        Records already formatted by a worker process.
+        """
+        with self.__lock:
+            self._header()
+            self.stream.write(text)
+        return None
+
+    def flush(self) -> None:
+        with self.__lock:
+            self.stream.flush()
+        return None
+
+
+# ======================================================================================================================
+# Objects
+# ======================================================================================================================
+reporter = Reporter()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+from .log import log
+from .zabbix import zabbix_item_get_by_id, zabbix_item_get_by_template, zabbix_trigger_get_by_id, \
+    zabbix_trigger_get_by_template
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Rollup(object):
+    """
+    Broken inherited items and triggers of one server grouped by the parent template object (templateid).
+    A group is printed once with the number of affected and inheriting hosts instead of a line per host.
+    Disabling the template object disables all its copies, so it is offered (interactively only) when the object
+    is broken on every inheriting host.
+    """
+
+    def __init__(self):
+        self.groups = dict()
+
+    def add(self, record, templateid, host) -> bool:
+        """
+        False if the object is not inherited from a template.
+        """
+        if not templateid or record['type'] not in ('item', 'trigger'):
+            return False
+        group = self.groups.setdefault((record['type'], templateid), {
+            'hosts': [], 'errors': dict(), 'template': "", 'name': record['name'], 'key': record.get('key', ""),
+            'inheritors': 0})
+        group['hosts'].append(host)
+        group['errors'][record['error']] = group['errors'].get(record['error'], 0) + 1
+        return True
+
+    def resolve(self, zabbix_server) -> None:
+        """
+        Names of the template objects, their templates and the number of inheriting hosts (and templates),
+        four requests per server. If a request fails the names of the host objects are kept, the number of
+        inheriting hosts stays unknown (0).
+        """
+        for kind, get, id_field, output in (
+                ('item', zabbix_item_get_by_id, 'itemid', ["itemid", "name", "key_"]),
+                ('trigger', zabbix_trigger_get_by_id, 'triggerid', ["triggerid", "description"])):
+            ids = [x[1] for x in self.groups if x[0] == kind]
+            if not ids:
+                continue
+            objects = get(zabbix_server, ids, output=output, extend_hosts=["host"])
+            for obj in objects or []:
+                group = self.groups.get((kind, int(obj[id_field])))
+                if group is None:
+                    continue
+                group['template'] = ", ".join(h['host'] for h in obj.get('hosts', []))
+                group['name'] = obj.get('name', obj.get('description', group['name']))
+                group['key'] = obj.get('key_', group['key'])
+        # Наследники: копии объекта на узлах сети и шаблонах
+        for kind, get, kwargs in (
+                ('item', zabbix_item_get_by_template, {'output': ["itemid", "hostid", "templateid"]}),
+                ('trigger', zabbix_trigger_get_by_template, {'output': ["triggerid", "templateid"],
+                                                             'extend_hosts': ["hostid"]})):
+            ids = [x[1] for x in self.groups if x[0] == kind]
+            if not ids:
+                continue
+            inheritors = dict()
+            for obj in get(zabbix_server, ids, **kwargs) or []:
+                hostids = [h['hostid'] for h in obj['hosts']] if 'hosts' in obj else [obj['hostid']]
+                inheritors.setdefault(int(obj['templateid']), set()).update(hostids)
+            for templateid, hostids in inheritors.items():
+                if (kind, templateid) in self.groups:
+                    self.groups[(kind, templateid)]['inheritors'] = len(hostids)
+        return None
+
+    def report(self, zabbix_server, remediation=None) -> None:
+        """
+        Print the groups, most affected hosts first, and offer the template objects broken on every inheriting host
+        for disabling.
+        """
+        if not self.groups:
+            return None
+        self.resolve(zabbix_server)
+        log.s("---->{}<----".format("TEMPLATE ROLLUP".rjust(42 + 7).ljust(85)))
+        for (kind, templateid), group in sorted(self.groups.items(), key=lambda x: (-len(x[1]['hosts']), x[0])):
+            error = max(group['errors'], key=group['errors'].get)
+            if kind == 'item':
+                info_str = "itemid={} template='{}' name='{}' key='{}' error='{}'".format(
+                    templateid, group['template'], group['name'], group['key'], error)
+            else:
+                info_str = "triggerid: {}, template: '{}', description: '{}', error: '{}'".format(
+                    templateid, group['template'], group['name'], error)
+            if len(group['errors']) > 1:
+                info_str += " (+{} other errors)".format(len(group['errors']) - 1)
+            broken = len(set(group['hosts']))
+            info_str = "Broken on {} of {} hosts: {}".format(broken, group['inheritors'] or "?", info_str)
+            log.i(info_str)
+            log.d1("... hosts: {}".format(", ".join(sorted(set(group['hosts'])))))
+            if remediation is None:
+                continue
+            # Шаблонный объект с исправными наследниками не отключается: изменение затронуло бы и их
+            if group['inheritors'] and broken >= group['inheritors']:
+                remediation.select(kind, templateid, group['key'] if kind == 'item' else group['name'], error,
+                                   info_str, template=True)
+            else:
+                log.d1("Template {} is not offered for disabling: not broken on every inheriting host".format(kind))
+        return None
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import json
+import os
+import sqlite3
+import time
+import traceback
+
+from .log import log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS broken (
+    section TEXT NOT NULL,
+    hostid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    objectid INTEGER NOT NULL,
+    info TEXT NOT NULL,
+    PRIMARY KEY (section, hostid, kind, objectid)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    section TEXT PRIMARY KEY,
+    clock REAL NOT NULL
+);
+"""
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class State(object):
+    """
+    Broken objects of the last run per config section and host, kept in a SQLite database.
+    Sections are independent even if they check the same server (other host groups, exclusions or credentials).
+    Objects are identified by kind ('lld', 'item', 'trigger') and id, info is a dict of the object fields kept as JSON
+    ('text' is the string printed for the object).
+    Changes are kept in memory and written by commit() in one short transaction, the database is not locked while
+    the server is checked, so several processes can share it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__db = None
+        self.__saved = dict()
+        self.__retained = None
+
+    def open(self) -> bool:
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Транзакции открываются явно в commit()
+            self.__db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            # Состояние старого формата (по адресу сервера) не переносится: первый запуск сообщает обо всех объектах
+            columns = [x[1] for x in self.__db.execute("PRAGMA table_info(broken)")]
+            if columns and 'section' not in columns:
+                self.__db.executescript("DROP TABLE IF EXISTS broken; DROP TABLE IF EXISTS runs;")
+            self.__db.executescript(_SCHEMA)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+        # ______________________________________________________________________
+        log.d1("State database :: {}".format(self.path))
+        return True
+
+    def close(self) -> None:
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+        return None
+
+    def last_run(self, section):
+        try:
+            row = self.__db.execute("SELECT clock FROM runs WHERE section = ?", (section,)).fetchone()
+        except sqlite3.Error as err:
+            log.e("State database error :: {} :: {}".format(self.path, err))
+            return None
+        return row[0] if row else None
+
+    def load(self, section) -> dict or None:
+        """
+        {hostid: {(kind, objectid): info}} or None if the database is not readable.
+        """
+        result = dict()
+        try:
+            for hostid, kind, objectid, info in self.__db.execute(
+                    "SELECT hostid, kind, objectid, info FROM broken WHERE section = ?", (section,)):
+                try:
+                    info = json.loads(info)
+                except ValueError:
+                    info = {'text': info}
+                result.setdefault(hostid, dict())[(kind, objectid)] = info
+        except sqlite3.Error as err:
+            log.e("State database error :: {} :: {}".format(self.path, err))
+            return None
+        return result
+
+    def save(self, section, hostid, broken) -> None:
+        """
+        Replace the broken objects of the host, written by commit().
+        """
+        self.__saved[hostid] = [(section, hostid, k[0], k[1], json.dumps(v, ensure_ascii=False))
+                                for k, v in broken.items()]
+        return None
+
+    def retain(self, section, hostids) -> None:
+        """
+        Forget hosts of the section that are not in hostids (deleted, disabled or out of the selected groups)
+        by commit().
+        """
+        self.__retained = set(hostids)
+        return None
+
+    def commit(self, section) -> bool:
+        """
+        Write the saved hosts and the time of the run in one transaction, the changes are cleared in any case.
+        """
+        saved, retained = self.__saved, self.__retained
+        self.__saved, self.__retained = dict(), None
+        try:
+            # Блокировка на запись сразу: ожидание другого процесса до timeout вместо ошибки посреди транзакции
+            self.__db.execute("BEGIN IMMEDIATE")
+            try:
+                for hostid, rows in saved.items():
+                    self.__db.execute("DELETE FROM broken WHERE section = ? AND hostid = ?", (section, hostid))
+                    self.__db.executemany(
+                        "INSERT INTO broken (section, hostid, kind, objectid, info) VALUES (?, ?, ?, ?, ?)", rows)
+                if retained is not None:
+                    stale = [x[0] for x in self.__db.execute(
+                        "SELECT DISTINCT hostid FROM broken WHERE section = ?", (section,)) if x[0] not in retained]
+                    self.__db.executemany("DELETE FROM broken WHERE section = ? AND hostid = ?",
+                                          [(section, x) for x in stale])
+                self.__db.execute("INSERT OR REPLACE INTO runs (section, clock) VALUES (?, ?)", (section, time.time()))
+                self.__db.execute("COMMIT")
+            except BaseException:
+                self.__db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as err:
+            log.e("State database error :: {} :: {}".format(self.path, err))
+            return False
+        # ______________________________________________________________________
+        return True
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import contextlib
+import json
+import math
+import threading
+import time
+import traceback
+
+from .log import log
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Stats(object):
+    """
+    Wall time of the work phases and per API method call statistics (latency, sizes, errors, retries) for --profile.
+    setup(True) starts the recording; a worker process returns its calls by dump(), the parent adds them by merge().
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.__lock = threading.Lock()
+        self.phases = dict()
+        self.calls = dict()
+
+    def setup(self, enabled) -> None:
+        self.enabled = enabled
+        return None
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.phases = dict()
+            self.calls = dict()
+        return None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds) -> None:
+        if not self.enabled:
+            return None
+        with self.__lock:
+            self.phases.setdefault(name, []).append(seconds)
+        return None
+
+    @staticmethod
+    def new_call() -> dict:
+        return {'latency': [], 'request_bytes': 0, 'response_bytes': 0, 'wire_bytes': 0, 'decode_seconds': 0.0,
+                'errors': 0, 'retries': 0}
+
+    def add_call(self, method, seconds, request_bytes=0, response_bytes=0, wire_bytes=0, decode_seconds=0.0,
+                 error=False) -> None:
+        if not self.enabled:
+            return None
+        with self.__lock:
+            call = self.calls.setdefault(method, self.new_call())
+            call['latency'].append(seconds)
+            call['request_bytes'] += request_bytes
+            call['response_bytes'] += response_bytes
+            call['wire_bytes'] += wire_bytes
+            call['decode_seconds'] += decode_seconds
+            call['errors'] += int(error)
+        return None
+
+    def add_retry(self, method) -> None:
+        """
+        A failed call of the method is repeated, the failed attempt itself is added by add_call(error=True).
+        """
+        if not self.enabled:
+            return None
+        with self.__lock:
+            self.calls.setdefault(method, self.new_call())['retries'] += 1
+        return None
+
+    def counts(self) -> dict:
+        """
+        {method: (calls, errors)}
+        """
+        with self.__lock:
+            return {k: (len(v['latency']), v['errors']) for k, v in self.calls.items()}
+
+    def dump(self) -> dict:
+        with self.__lock:
+            return {'phases': {k: list(v) for k, v in self.phases.items()},
+                    'calls': {k: dict(v, latency=list(v['latency'])) for k, v in self.calls.items()}}
+
+    def merge(self, data) -> None:
+        with self.__lock:
+            for name, values in data['phases'].items():
+                self.phases.setdefault(name, []).extend(values)
+            for method, value in data['calls'].items():
+                call = self.calls.setdefault(method, self.new_call())
+                call['latency'].extend(value['latency'])
+                for k in ('request_bytes', 'response_bytes', 'wire_bytes', 'decode_seconds', 'errors', 'retries'):
+                    call[k] += value.get(k, 0)
+        return None
+
+    @staticmethod
+    def percentile(values, p):
+        """
+        Nearest-rank percentile of a sorted list.
+        """
+        if not values:
+            return 0.0
+        return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+    def summary(self) -> dict:
+        result = {'phases': dict(), 'calls': dict()}
+        with self.__lock:
+            for name, values in self.phases.items():
+                values = sorted(values)
+                result['phases'][name] = {'count': len(values), 'total': sum(values),
+                                          'p50': self.percentile(values, 50), 'p90': self.percentile(values, 90),
+                                          'max': values[-1]}
+            for method, call in self.calls.items():
+                values = sorted(call['latency'])
+                result['calls'][method] = {'count': len(values), 'errors': call['errors'],
+                                           'retries': call['retries'], 'total': sum(values),
+                                           'p50': self.percentile(values, 50), 'p90': self.percentile(values, 90),
+                                           'p99': self.percentile(values, 99), 'max': values[-1],
+                                           'request_bytes': call['request_bytes'],
+                                           'response_bytes': call['response_bytes'],
+                                           'wire_bytes': call['wire_bytes'],
+                                           'decode_seconds': call['decode_seconds']}
+        return result
+
+    def report(self) -> None:
+        summary = self.summary()
+        log.s("-" * 112)
+        log.i("{:<20} {:>8} {:>10} {:>10} {:>10} {:>10}".format("Phase", "count", "total,s", "p50,ms", "p90,ms",
+                                                                 "max,ms"))
+        for name, x in sorted(summary['phases'].items(), key=lambda x: -x[1]['total']):
+            log.i("{:<20} {:>8} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                name, x['count'], x['total'], x['p50'] * 1000, x['p90'] * 1000, x['max'] * 1000))
+        log.s("-" * 112)
+        log.i("{:<20} {:>6} {:>5} {:>5} {:>9} {:>8} {:>8} {:>8} {:>10} {:>10} {:>10} {:>8}".format(
+            "API method", "calls", "err", "retry", "total,s", "p50,ms", "p90,ms", "p99,ms", "req,KiB", "wire,KiB",
+            "resp,KiB", "decode,s"))
+        for method, x in sorted(summary['calls'].items(), key=lambda x: -x[1]['total']):
+            log.i("{:<20} {:>6} {:>5} {:>5} {:>9.3f} {:>8.1f} {:>8.1f} {:>8.1f} {:>10.1f} {:>10.1f} {:>10.1f} "
+                  "{:>8.3f}".format(method, x['count'], x['errors'], x['retries'], x['total'], x['p50'] * 1000,
+                                    x['p90'] * 1000, x['p99'] * 1000, x['request_bytes'] / 1024.0,
+                                    x['wire_bytes'] / 1024.0, x['response_bytes'] / 1024.0, x['decode_seconds']))
+        return None
+
+    def write_json(self, path) -> bool:
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.summary(), f, indent=2, sort_keys=True)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+        # ______________________________________________________________________
+        return True
+
+
+# ======================================================================================================================
+# Objects
+# ======================================================================================================================
+stats = Stats()
@@ -1,85 +1,345 @@
 # -*- coding: utf-8 -*-
 # 29.09.2020
 # ----------------------------------------------------------------------------------------------------------------------
+import concurrent.futures
+import hashlib
+import http.client
+import os
+import time
 import traceback
+import urllib.error
 
+from .guard import Guard
 from .log import log
+from .stats import stats
 from .zapi import ZabbixAPI, ZabbixAPIException
 
+# Ответы HTTP, после которых запрос повторяется (перегрузка или перезапуск фронтенда)
+_RETRY_HTTP_STATUSES = (429, 500, 502, 503, 504)
+# Ошибки транспорта: в журнал без трассировки
+_TRANSPORT_ERRORS = (OSError, http.client.HTTPException, ValueError)
+# Соединение без политики вызовов: одна попытка, без автомата защиты
+_GUARD_DEFAULT = Guard(attempts=1, breaker_threshold=0)
+
 
 # ======================================================================================================================
 # JSON API | Base functions
 # ======================================================================================================================
-def zabbix_connect(host, user, password, attempts=1) -> ZabbixAPI or None:
+def zabbix_connect(host, user, password, token=None, session_cache=None, attempts=None, pool_size=8,
+                   cassette=None, compression=True, guard=None, cache=None) -> ZabbixAPI or None:
+    """
+    token: API token (Zabbix 5.4+), used instead of user.login.
+    session_cache: directory where session ids are kept between runs, a cached session is checked and reused.
+    cassette: opened slib3.cassette.Cassette, requests are recorded to it or answered from it.
+    compression: accept gzip/deflate compressed responses.
+    guard: slib3.guard.Guard, call policy of the server (retries, limits, circuit breaker, timeouts).
+    cache: slib3.cache.Cache, results of slow-changing methods are read from it.
+    Transport errors are retried, API errors (e.g. wrong password) are not.
+    """
+    guard = guard or Guard()
+    attempts = attempts or guard.attempts
     cnt = 0
     while cnt < attempts:
         cnt += 1
+        zabbix_server = None
+        start = time.perf_counter()
         try:
-            zabbix_server = ZabbixAPI(url=host, user=user, password=password)
+            zabbix_server = ZabbixAPI(url=host, user=user, password=password, pool_size=pool_size, token=token,
+                                      cassette=cassette, compression=compression, timeout=guard.timeout)
+            zabbix_server.guard = guard
+            zabbix_server.cache = cache
+            if token:
+                return zabbix_server
+            if session_cache:
+                auth = zabbix_session_load(session_cache, host, user)
+                if auth and zabbix_server.check_authentication(auth):
+                    log.d1("ZabbixAPI session reused :: {}".format(host))
+                    zabbix_server.set_auth(auth)
+                    return zabbix_server
             zabbix_server.login()
+            stats.add_call("user.login", time.perf_counter() - start)
+            if session_cache:
+                zabbix_session_save(session_cache, host, user, zabbix_server.get_auth())
             return zabbix_server
-        except ZabbixAPIException as err:
-            log.e("ZabbixAPI Exception: {}".format(err.args[0]))
-            continue
         except Exception as err:
-            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
-            continue
+            stats.add_call("user.login", time.perf_counter() - start, error=True)
+            if zabbix_server is not None:
+                zabbix_server.close()
+            # Ошибка API (например, неверный пароль) не повторяется: повторные входы блокируют пользователя
+            if isinstance(err, ZabbixAPIException) and not zabbix_retriable(err.__cause__):
+                log.e("ZabbixAPI Exception: {}".format(err.args[0]))
+                return None
+            if cnt < attempts:
+                delay = guard.delay(cnt)
+                guard.retry()
+                log.w("ZabbixAPI connect retry {}/{} in {:.1f}s :: {}: {}".format(cnt, attempts - 1, delay,
+                                                                                 type(err).__name__, err))
+                time.sleep(delay)
+                continue
+            if isinstance(err, (ZabbixAPIException,) + _TRANSPORT_ERRORS):
+                log.e("ZabbixAPI connect failed :: {} :: {}: {}".format(host, type(err).__name__, err))
+            else:
+                log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
     # __________________________________________________________________________
     return None
 
 
-def zabbix_query(zabbix_server, method, params, attempts=1):
+def zabbix_disconnect(zabbix_server, logout=True):
+    if logout:
+        zabbix_query(zabbix_server, "user.logout", [])
+    zabbix_server.close()
+
+
+def zabbix_session_path(session_cache, host, user):
+    key = hashlib.sha256("{}\0{}".format(host.rstrip('/'), user).encode('utf-8')).hexdigest()
+    return os.path.join(session_cache, key + '.session')
+
+
+def zabbix_session_load(session_cache, host, user):
+    path = zabbix_session_path(session_cache, host, user)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip() or None
+    except Exception as err:
+        log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+        return None
+
+
+def zabbix_session_save(session_cache, host, user, auth):
+    """
+    The session id is written atomically to a file readable only by the owner.
+    """
+    path = zabbix_session_path(session_cache, host, user)
+    try:
+        os.makedirs(session_cache, mode=0o700, exist_ok=True)
+        fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(auth)
+        os.replace(path + '.tmp', path)
+    except Exception as err:
+        log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+        return False
+    # __________________________________________________________________________
+    log.d2("Session cached :: {}".format(path))
+    return True
+
+
+def zabbix_retriable(err) -> bool:
+    """
+    Transport errors, timeouts, truncated responses and HTTP 429/5xx are retried, API errors are not.
+    err: exception of the request or None.
+    """
+    if isinstance(err, urllib.error.HTTPError):
+        return err.code in _RETRY_HTTP_STATUSES
+    return err is not None and not isinstance(err, ZabbixAPIException)
+
+
+def zabbix_query(zabbix_server, method, params, attempts=None, cache=True):
+    """
+    Result of the method or None. The call follows the guard of the server: attempts (the guard's by default)
+    within its deadline, pauses between attempts, request limits and the circuit breaker.
+    cache: the result is read from and written to the cache of the server if the method is cached.
+    """
+    cache = zabbix_server.cache if cache else None
+    if cache is not None:
+        result = cache.get(method, params)
+        if result is not None:
+            return result
+    guard = zabbix_server.guard or _GUARD_DEFAULT
+    attempts = attempts or guard.attempts
+    deadline = time.monotonic() + guard.deadline
     response = None
-    cnt = 0
-    while cnt < attempts:
-        cnt += 1
-        try:
-            log.d2("ZabbixAPI Req:\n-{0}\n{1}\n-{0}".format("  -" * 33, zabbix_server.json_obj(method, params)))
-            response = zabbix_server.post_request(zabbix_server.json_obj(method, params))
-            log.d2("ZabbixAPI Res:\n-{0}\n{1}\n-{0}".format("  -" * 33, response))
+    json_obj = zabbix_server.json_obj(method, params)
+    debug = log.is_enabled(log.DEBUG2)
+    if debug:
+        log.d2("ZabbixAPI Req:\n-{0}\n{1}\n-{0}".format("  -" * 33, json_obj.decode('utf-8')))
+    try:
+        for cnt in range(1, attempts + 1):
+            if not guard.allow():
+                stats.add_call(method, 0.0, error=True)
+                log.d1("Circuit breaker open, request rejected :: {}".format(method))
+                return None
+            info = dict()
+            start = time.perf_counter()
+            try:
+                with guard.slot():
+                    timeout = min(guard.timeout, max(1.0, deadline - time.monotonic()))
+                    response = zabbix_server.post_request(json_obj, info=info, timeout=timeout)
+            except Exception as err:
+                stats.add_call(method, time.perf_counter() - start, error=True)
+                if isinstance(err, ZabbixAPIException):
+                    log.e("ZabbixAPI Exception: {} :: {}".format(err.args[0], method))
+                    return None
+                guard.failure()
+                # ______________________________________________________________
+                # Повтор после паузы, если он укладывается в срок вызова
+                delay = guard.delay(cnt)
+                if zabbix_retriable(err) and cnt < attempts and time.monotonic() + delay < deadline:
+                    guard.retry()
+                    stats.add_retry(method)
+                    log.w("ZabbixAPI retry {}/{} in {:.1f}s :: {} :: {}: {}".format(cnt, attempts - 1, delay, method,
+                                                                                   type(err).__name__, err))
+                    time.sleep(delay)
+                    continue
+                if isinstance(err, _TRANSPORT_ERRORS):
+                    log.e("ZabbixAPI request failed :: {} :: {}: {}".format(method, type(err).__name__, err))
+                else:
+                    log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+                return None
+            guard.success()
+            if debug:
+                log.d2("ZabbixAPI Res:\n-{0}\n{1}\n-{0}".format("  -" * 33, response))
             break
-        except Exception as err:
-            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
-            continue
+    finally:
+        # Пробный запрос без ответа сервера (ошибка API-клиента) не должен держать предохранитель открытым
+        guard.release()
     # __________________________________________________________________________
     if isinstance(response, dict):
+        stats.add_call(method, time.perf_counter() - start, error="error" in response, **info)
         if "error" in response:
             log.e("ZabbixAPI Err:\n-{0}\n{1}\n-{0}".format("  -" * 33, response))
         elif "result" in response:
+            if cache is not None:
+                cache.put(method, params, response['result'])
             return response['result']
     # __________________________________________________________________________
     return None
 
 
+def zabbix_count(zabbix_server, method, attempts=None, **kwargs):
+    """
+    Number of objects returned by the method with countOutput.
+    """
+    result = zabbix_query(zabbix_server, method, dict(kwargs, countOutput=True), attempts=attempts)
+    return int(result) if result is not None else None
+
+
+def zabbix_count_by_host(zabbix_server, hostids, attempts=None):
+    """
+    Number of discovery rules, items and triggers per host: {hostid: {'lld': n, 'item': n, 'trigger': n}} or None.
+    One host.get request with the counts of the objects of each host, disabled objects are counted too.
+    """
+    params = {'output': ["hostid"], 'hostids': hostids, 'selectDiscoveries': "count", 'selectItems': "count",
+              'selectTriggers': "count"}
+    result = zabbix_query(zabbix_server, "host.get", params, attempts=attempts, cache=False)
+    if result is None:
+        return None
+    return {x['hostid']: {'lld': int(x.get('discoveries', 0)), 'item': int(x.get('items', 0)),
+                          'trigger': int(x.get('triggers', 0))} for x in result}
+
+
+def zabbix_api_version(zabbix_server, attempts=None):
+    """
+    Version of the API as a tuple of integers, e.g. (5, 4, 0), or None.
+    """
+    result = zabbix_query(zabbix_server, "apiinfo.version", [], attempts=attempts)
+    try:
+        return tuple(int(x) for x in str(result).split('.')[:3])
+    except ValueError:
+        return None
+
+
+def zabbix_query_pages(zabbix_server, method, params, id_field, page_size, attempts=None):
+    """
+    Get objects page by page. The sorted list of ids is requested first, then objects are requested by pages of
+    page_size ids; the next page is requested in the background while the current one is processed.
+    Returns a generator of objects or None if the ids could not be retrieved.
+    A page that could not be retrieved raises ZabbixAPIException while iterating.
+    """
+    ids_params = {k: v for k, v in params.items() if not k.startswith('select')}
+    ids_params.update({'output': [id_field], 'sortfield': id_field})
+    ids = zabbix_query(zabbix_server, method, ids_params, attempts=attempts)
+    if ids is None:
+        return None
+    ids = [x[id_field] for x in ids]
+    # __________________________________________________________________________
+    return _zabbix_query_pages(zabbix_server, method, params, id_field, ids, page_size, attempts)
+
+
+def _zabbix_query_pages(zabbix_server, method, params, id_field, ids, page_size, attempts):
+    pages = [ids[x:x + page_size] for x in range(0, len(ids), page_size)]
+    if not pages:
+        return
+    # __________________________________________________________________________
+    def query(page):
+        return zabbix_query(zabbix_server, method, dict(params, sortfield=id_field, **{id_field + 's': page}),
+                            attempts=attempts)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(query, pages[0])
+        for n in range(len(pages)):
+            result = future.result()
+            if n + 1 < len(pages):
+                future = executor.submit(query, pages[n + 1])
+            if result is None:
+                raise ZabbixAPIException("Failed to get page {} of {} :: method: {}".format(n + 1, len(pages), method))
+            for x in result:
+                yield x
+
+
 # ======================================================================================================================
 # JSON API | Class "host"
 # ======================================================================================================================
-def zabbix_host_get(zabbix_server, name=None, extend_groups=False, attempts=1, **kwargs):
-    params = {'output': "extend", 'sortfield': "name", 'filter': dict()}
+def zabbix_host_get(zabbix_server, name=None, output="extend", search_name=None, groupids=None, extend_groups=False,
+                    extend_interfaces=False, hostids=None, cache=True, attempts=None, **kwargs):
+    """
+    cache: False for volatile fields (availability, maintenance), the result is always requested.
+    """
+    params = {'output': output, 'sortfield': "name", 'filter': dict()}
     if name:
         params['filter'].update({'host': name})
+    elif search_name:
+        # Поиск по видимому имени без учета регистра
+        params['search'] = {'name': search_name}
     else:
         params['search'] = {'host': ""}
+    if groupids is not None:
+        params['groupids'] = groupids
+    if hostids is not None:
+        params['hostids'] = hostids
     if extend_groups:
-        params['selectGroups'] = "extend"
+        params['selectGroups'] = extend_groups if isinstance(extend_groups, list) else "extend"
+    if extend_interfaces:
+        params['selectInterfaces'] = extend_interfaces if isinstance(extend_interfaces, list) else "extend"
+    # custom filter
+    params['filter'].update(kwargs)
+    # __________________________________________________________________________
+    return zabbix_query(zabbix_server, "host.get", params, attempts=attempts, cache=cache)
+
+
+# ======================================================================================================================
+# JSON API | Class "hostgroup"
+# ======================================================================================================================
+def zabbix_hostgroup_get(zabbix_server, name=None, output="extend", attempts=None, **kwargs):
+    params = {'output': output, 'sortfield': "name", 'filter': dict()}
+    if name:
+        params['filter'].update({'name': name})
     # custom filter
     params['filter'].update(kwargs)
     # __________________________________________________________________________
-    return zabbix_query(zabbix_server, "host.get", params, attempts=attempts)
+    return zabbix_query(zabbix_server, "hostgroup.get", params, attempts=attempts)
 
 
 # ======================================================================================================================
 # JSON API | Class "item"
 # ======================================================================================================================
-def zabbix_item_get(zabbix_server, host, attempts=1, **kwargs):
-    params = {'output': "extend", 'filter': dict()}
-    if isinstance(host, int):
+def zabbix_item_get(zabbix_server, host, output="extend", broken_only=False, page_size=None, attempts=None, **kwargs):
+    params = {'output': output, 'filter': dict()}
+    if isinstance(host, (int, list)):
         params['hostids'] = host
     else:
         params['host'] = host
+    if broken_only:
+        # Только включенные неподдерживаемые элементы данных контролируемых узлов сети
+        params['monitored'] = True
+        params['filter'].update({'status': 0, 'state': 1})
     # custom filter
     params['filter'].update(kwargs)
     # __________________________________________________________________________
+    if page_size:
+        return zabbix_query_pages(zabbix_server, "item.get", params, "itemid", page_size, attempts=attempts)
     return zabbix_query(zabbix_server, "item.get", params, attempts=attempts)
 
 
@@ -91,19 +351,44 @@ def zabbix_item_update(zabbix_server, data):
     return zabbix_query(zabbix_server, "item.update", data)
 
 
+def zabbix_item_get_by_id(zabbix_server, itemids, output="extend", extend_hosts=False, attempts=None):
+    # Совпадение по id во всех узлах/шаблонах
+    params = {'output': output, 'itemids': itemids}
+    if extend_hosts:
+        params['selectHosts'] = extend_hosts if isinstance(extend_hosts, list) else "extend"
+    return zabbix_query(zabbix_server, "item.get", params, attempts=attempts)
+
+
+def zabbix_item_get_by_template(zabbix_server, templateids, output="extend", attempts=None):
+    # Объекты узлов сети и шаблонов, унаследованные от объектов шаблона
+    params = {'output': output, 'filter': {'templateid': templateids}}
+    return zabbix_query(zabbix_server, "item.get", params, attempts=attempts)
+
+
 # ======================================================================================================================
 # JSON API | Class "trigger"
 # ======================================================================================================================
-def zabbix_trigger_get(zabbix_server, host, attempts=1, **kwargs):
+def zabbix_trigger_get(zabbix_server, host, output="extend", extend_functions=True, extend_hosts=False,
+                       broken_only=False, page_size=None, attempts=None, **kwargs):
     # 'selectDependencies': "extend"
-    params = {'output': "extend", 'selectFunctions': "extend", 'filter': dict()}
-    if isinstance(host, int):
+    params = {'output': output, 'filter': dict()}
+    if isinstance(host, (int, list)):
         params['hostids'] = host
     else:
         params['host'] = host
+    if extend_functions:
+        params['selectFunctions'] = "extend"
+    if extend_hosts:
+        params['selectHosts'] = extend_hosts if isinstance(extend_hosts, list) else "extend"
+    if broken_only:
+        # Только включенные триггеры в неизвестном состоянии контролируемых узлов сети
+        params['active'] = True
+        params['filter'].update({'status': 0, 'state': 1})
     # custom filter
     params['filter'].update(kwargs)
     # __________________________________________________________________________
+    if page_size:
+        return zabbix_query_pages(zabbix_server, "trigger.get", params, "triggerid", page_size, attempts=attempts)
     return zabbix_query(zabbix_server, "trigger.get", params, attempts=attempts)
 
 
@@ -120,21 +405,27 @@ def zabbix_trigger_adddependencies(zabbix_server, trigger, depends_on_trigger_id
                         {'triggerid': trigger, 'dependsOnTriggerid': depends_on_trigger_id})
 
 
-# def zabbix_trigger_get_by_id(zabbix_server, triggerid):
-#    # Совпадение по id во всех узлах/шаблонах
-#    if isinstance(triggerid, int) or (isinstance(triggerid, str) and triggerid.isdigit()):
-#        result = zabbix_query(zabbix_server, "trigger.get",
-#                              {'output': "extend", 'selectFunctions': "extend", 'triggerids': triggerid})
-#    if result:
-#        return result
-#   else:
-#        return list()
+def zabbix_trigger_get_by_id(zabbix_server, triggerids, output="extend", extend_hosts=False, attempts=None):
+    # Совпадение по id во всех узлах/шаблонах
+    params = {'output': output, 'triggerids': triggerids}
+    if extend_hosts:
+        params['selectHosts'] = extend_hosts if isinstance(extend_hosts, list) else "extend"
+    return zabbix_query(zabbix_server, "trigger.get", params, attempts=attempts)
+
+
+def zabbix_trigger_get_by_template(zabbix_server, templateids, output="extend", extend_hosts=False, attempts=None):
+    # Объекты узлов сети и шаблонов, унаследованные от объектов шаблона
+    params = {'output': output, 'filter': {'templateid': templateids}}
+    if extend_hosts:
+        params['selectHosts'] = extend_hosts if isinstance(extend_hosts, list) else "extend"
+    return zabbix_query(zabbix_server, "trigger.get", params, attempts=attempts)
 
 
 # ======================================================================================================================
 # JSON API | Class "template"
 # ======================================================================================================================
-def zabbix_template_get(zabbix_server, name=None, extend_items=False, extend_discoveries=False, attempts=1, **kwargs):
+def zabbix_template_get(zabbix_server, name=None, extend_items=False, extend_discoveries=False, attempts=None,
+                        **kwargs):
     params = {'output': "extend", 'sortfield': "name", 'with_items': True, 'filter': dict()}
     if isinstance(name, int):
         params['templateids'] = name
@@ -153,15 +444,19 @@ def zabbix_template_get(zabbix_server, name=None, extend_items=False, extend_dis
 # ======================================================================================================================
 # JSON API | Class "discoveryrule"
 # ======================================================================================================================
-def zabbix_discoveryrule_get(zabbix_server, host=None, extend_items=False, attempts=1, **kwargs):
-    params = {'output': "extend", 'filter': dict()}
-    if isinstance(host, int):
+def zabbix_discoveryrule_get(zabbix_server, host=None, output="extend", extend_items=False, broken_only=False,
+                             attempts=None, **kwargs):
+    params = {'output': output, 'filter': dict()}
+    if isinstance(host, (int, list)):
         params['hostids'] = host
     else:
         params['host'] = host
     if extend_items:
         params['selectItems'] = "extend"
-    params['filter'] = kwargs
+    if broken_only:
+        # Только включенные неподдерживаемые правила обнаружения контролируемых узлов сети
+        params['monitored'] = True
+        params['filter'].update({'status': 0, 'state': 1})
     # custom filter
     params['filter'].update(kwargs)
     # __________________________________________________________________________
@@ -171,7 +466,7 @@ def zabbix_discoveryrule_get(zabbix_server, host=None, extend_items=False, attem
 # ======================================================================================================================
 # JSON API | Class "graph"
 # ======================================================================================================================
-def zabbix_graph_get(zabbix_server, attempts=1, **kwargs):
+def zabbix_graph_get(zabbix_server, attempts=None, **kwargs):
     params = {'output': "extend", 'sortfield': "name", 'filter': dict()}
     # custom filter
     params['filter'].update(kwargs)
@@ -190,7 +485,7 @@ def zabbix_graph_update(zabbix_server, data):
 # ======================================================================================================================
 # JSON API | Class "screen"
 # ======================================================================================================================
-def zabbix_screen_get(zabbix_server, attempts=1, **kwargs):
+def zabbix_screen_get(zabbix_server, attempts=None, **kwargs):
     params = {'output': "extend", 'sortfield': "name", 'filter': dict()}
     # custom filter
     params['filter'].update(kwargs)
@@ -209,7 +504,7 @@ def zabbix_screen_update(zabbix_server, data):
 # ======================================================================================================================
 # JSON API | Class "application"
 # ======================================================================================================================
-def zabbix_application_get(zabbix_server, attempts=1, **kwargs):
+def zabbix_application_get(zabbix_server, attempts=None, **kwargs):
     params = {'output': "extend", 'sortfield': "name", 'filter': dict()}
     # custom filter
     params['filter'].update(kwargs)
@@ -10,21 +10,181 @@
 # Date:   24, May, 2012
 ################################################
 
-try:
-    import simplejson as json
-except ImportError:
-    import json
-
+import base64
+import http.client
 import subprocess
+import threading
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
+import zlib
+
+from .codec import codec
 
 
 class ZabbixAPIException(Exception):
     pass
 
 
+class HTTPConnectionPool(object):
+    """
+    Persistent HTTP/1.1 connections to one endpoint, shared between threads.
+    A connection is taken from the pool for a single request and returned after the response is read.
+    With compression gzip/deflate responses are accepted and decompressed chunk by chunk while they are read.
+    Proxy settings are taken from the environment (http_proxy, https_proxy, no_proxy) like urllib does:
+    https is tunnelled by CONNECT, http requests are sent to the proxy with the absolute URL.
+    """
+
+    # Ошибки, при которых сервер закрыл простаивающее соединение
+    _STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+    # Размер блока чтения сжатого ответа
+    _CHUNK_SIZE = 65536
+
+    def __init__(self, url, maxsize=8, timeout=29, compression=True):
+        url = urllib.parse.urlsplit(url)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path + ('?' + url.query if url.query else '')
+        self.proxy = None
+        self.proxy_headers = dict()
+        proxy = urllib.request.getproxies().get(self.scheme)
+        if proxy and not urllib.request.proxy_bypass(url.netloc):
+            self.proxy = urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            if self.proxy.username is not None:
+                credentials = "{}:{}".format(urllib.parse.unquote(self.proxy.username),
+                                             urllib.parse.unquote(self.proxy.password or ""))
+                self.proxy_headers['Proxy-Authorization'] = \
+                    "Basic " + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+            if self.scheme != 'https':
+                # Через прокси HTTP запрос отправляется с абсолютным адресом
+                self.path = urllib.parse.urlunsplit((url.scheme, url.netloc, url.path, url.query, ''))
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.compression = compression
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.__idle = []
+        self.__lock = threading.Lock()
+
+    def _connect(self):
+        if self.proxy is not None:
+            port = self.proxy.port or (443 if self.proxy.scheme == 'https' else 80)
+            if self.scheme == 'https':
+                conn = http.client.HTTPSConnection(self.proxy.hostname, port, timeout=self.timeout)
+                conn.set_tunnel(self.host, self.port or 443, headers=self.proxy_headers)
+            else:
+                conn = http.client.HTTPConnection(self.proxy.hostname, port, timeout=self.timeout)
+        elif self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        with self.__lock:
+            self.connections_opened += 1
+        return conn
+
+    def _acquire(self, timeout=None):
+        with self.__lock:
+            conn, reused = (self.__idle.pop(), True) if self.__idle else (None, False)
+            if reused:
+                self.connections_reused += 1
+        if conn is None:
+            conn = self._connect()
+        # Тайм-аут запроса: для нового соединения при подключении, для открытого - сразу
+        conn.timeout = timeout or self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        return conn, reused
+
+    def _release(self, conn):
+        with self.__lock:
+            if len(self.__idle) < self.maxsize:
+                self.__idle.append(conn)
+                return
+        conn.close()
+
+    def _read(self, response):
+        """
+        Response body and the number of bytes received. A compressed body is never held in memory as a whole,
+        only the decompressed data is accumulated.
+        """
+        encoding = (response.getheader('Content-Encoding') or 'identity').strip().lower()
+        if encoding == 'identity':
+            data = response.read()
+            return data, len(data)
+        if encoding not in ('gzip', 'x-gzip', 'deflate'):
+            response.read()
+            raise ZabbixAPIException("Unsupported Content-Encoding: %s" % encoding)
+        # gzip и zlib определяются по заголовку потока, deflate без заголовка - при ошибке на первом блоке
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        data = bytearray()
+        received = 0
+        while True:
+            chunk = response.read(self._CHUNK_SIZE)
+            if not chunk:
+                break
+            if not received and encoding == 'deflate':
+                try:
+                    data += decompressor.decompress(chunk)
+                except zlib.error:
+                    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                    data += decompressor.decompress(chunk)
+            else:
+                data += decompressor.decompress(chunk)
+            received += len(chunk)
+        data += decompressor.flush()
+        return data, received
+
+    def _send(self, conn, body, headers):
+        if self.proxy is not None and self.scheme != 'https':
+            headers = dict(headers, **self.proxy_headers)
+        conn.request('POST', self.path, body, headers)
+        response = conn.getresponse()
+        data, received = self._read(response)
+        return response, data, received
+
+    def request(self, body, headers, timeout=None):
+        """
+        Returns status, reason, response body (bytes-like, decompressed) and the number of bytes received.
+        timeout: seconds for the request instead of the pool timeout.
+        """
+        if self.compression:
+            headers = dict(headers, **{'Accept-Encoding': 'gzip, deflate'})
+        conn, reused = self._acquire(timeout)
+        try:
+            try:
+                response, data, received = self._send(conn, body, headers)
+            except self._STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # Простаивающее соединение закрыто сервером, повтор через новое соединение
+                conn = self._connect()
+                conn.timeout = timeout or self.timeout
+                response, data, received = self._send(conn, body, headers)
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        with self.__lock:
+            self.bytes_received += received
+            self.bytes_decoded += len(data)
+        return response.status, response.reason, data, received
+
+    def close(self):
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for conn in idle:
+            conn.close()
+
+
 class ZabbixAPI(object):
     __auth = ''
     __id = 0
@@ -39,10 +199,21 @@ class ZabbixAPI(object):
     #     return cls._state[cls]
     ################################################################################################
 
-    def __init__(self, url, user, password):
+    def __init__(self, url, user, password, pool_size=8, token=None, cassette=None, compression=True, timeout=29):
         self.__url = url.rstrip('/') + '/api_jsonrpc.php'
         self.__user = user
         self.__password = password
+        if token:
+            # API token (Zabbix 5.4+) is used as is, login is not required
+            self.__auth = token
+        self.__pool = HTTPConnectionPool(self.__url, maxsize=pool_size, timeout=timeout, compression=compression)
+        # Политика вызовов сервера (slib3.guard.Guard), используется slib3.zabbix.zabbix_query
+        self.guard = None
+        # Кэш результатов на диске (slib3.cache.Cache), используется slib3.zabbix.zabbix_query
+        self.cache = None
+        # Запись/воспроизведение запросов (slib3.cassette.Cassette)
+        self.__cassette = cassette
+        self.__id_lock = threading.Lock()
         self._zabbix_api_object_list = ('Action', 'Alert', 'APIInfo', 'Application', 'DCheck', 'DHost', 'DRule',
                                         'DService', 'Event', 'Graph', 'Graphitem', 'History', 'Host', 'Hostgroup',
                                         'Image', 'Item',
@@ -64,8 +235,8 @@ class ZabbixAPI(object):
         obj = self.json_obj('user.login', user_info)
         try:
             content = self.post_request(obj)
-        except urllib.error.HTTPError:
-            raise ZabbixAPIException("Zabbix URL Error")
+        except urllib.error.HTTPError as e:
+            raise ZabbixAPIException("Zabbix URL Error") from e
         try:
             self.__auth = content['result']
         except KeyError as e:
@@ -75,6 +246,19 @@ class ZabbixAPI(object):
     def is_login(self):
         return self.__auth != ''
 
+    def get_auth(self):
+        return self.__auth
+
+    def set_auth(self, auth):
+        self.__auth = auth
+
+    def check_authentication(self, auth):
+        """
+        Check that the session id is still valid (the session lifetime is extended by the call).
+        """
+        content = self.post_request(self.json_obj('user.checkAuthentication', {'sessionid': auth}))
+        return 'result' in content
+
     def __checkAuth__(self):
         if not self.is_login():
             raise ZabbixAPIException("NOT logged in")
@@ -84,19 +268,60 @@ class ZabbixAPI(object):
                'method': method,
                'params': params,
                'id': self.__id}
-        if method != 'user.login':
+        if method not in ('user.login', 'user.checkAuthentication', 'apiinfo.version'):
             obj['auth'] = self.__auth
-        return json.dumps(obj)
-
-    def post_request(self, json_obj):
+        return codec.dumps(obj)
+
+    def post_request(self, json_obj, info=None, timeout=None):
+        """
+        json_obj: request body as bytes (json_obj()) or str.
+        timeout: seconds for the request, the timeout of the connection pool by default.
+        info: optional dict filled with request/response sizes and decode time,
+              response_bytes - decompressed size, wire_bytes - size as received.
+        """
         headers = {'Content-Type': 'application/json-rpc',
                    'User-Agent': 'python/zabbix_api'}
-        req = urllib.request.Request(self.__url, json_obj.encode("utf-8"), headers)
-        opener = urllib.request.urlopen(req, timeout=29)
-        content = json.loads(opener.read())
-        self.__id += 1
+        body = json_obj if isinstance(json_obj, bytes) else json_obj.encode("utf-8")
+        if self.__cassette is not None and self.__cassette.replay:
+            data = self.__cassette.get(json_obj)
+            if data is None:
+                raise ZabbixAPIException("Request is not recorded: %s" % codec.loads(body)['method'])
+            received = len(data)
+        else:
+            status, reason, data, received = self.__pool.request(body, headers, timeout=timeout)
+            if status != 200:
+                raise urllib.error.HTTPError(self.__url, status, reason, None, None)
+            if self.__cassette is not None:
+                self.__cassette.put(json_obj, data)
+        # Ответ декодируется прямо из полученного буфера
+        start = time.perf_counter()
+        content = codec.loads(data)
+        if info is not None:
+            info.update({'request_bytes': len(body), 'response_bytes': len(data), 'wire_bytes': received,
+                         'decode_seconds': time.perf_counter() - start})
+        with self.__id_lock:
+            self.__id += 1
         return content
 
+    @property
+    def connections_opened(self):
+        return self.__pool.connections_opened
+
+    @property
+    def connections_reused(self):
+        return self.__pool.connections_reused
+
+    @property
+    def bytes_received(self):
+        return self.__pool.bytes_received
+
+    @property
+    def bytes_decoded(self):
+        return self.__pool.bytes_decoded
+
+    def close(self):
+        self.__pool.close()
+
     '''
     /usr/local/zabbix/bin/zabbix_get is the default path to zabbix_get, it depends on the 'prefix' while install zabbix.
     plus, the ip(computer run this script) must be put into the conf of agent.
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from slib3.cache import Cache
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def cache(self, **kwargs):
+        return Cache(self.tmp.name, "http://zabbix\0user\0", kwargs.pop('ttl', {'host.get': 60}), **kwargs)
+
+    def test_get_and_put(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get('host.get', {'output': "extend"}))
+        self.assertTrue(cache.put('host.get', {'output': "extend"}, [{'hostid': "1"}]))
+        self.assertEqual(cache.get('host.get', {'output': "extend"}), [{'hostid': "1"}])
+        self.assertIsNone(cache.get('host.get', {'output': ["hostid"]}))
+        self.assertFalse(cache.put('item.get', {}, []))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_ttl(self):
+        cache = self.cache(ttl={'host.get': 0.05})
+        cache.put('host.get', {}, [])
+        self.assertEqual(cache.get('host.get', {}), [])
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('host.get', {}))
+        # Устаревший результат удаляется
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_refresh(self):
+        self.cache().put('host.get', {}, [])
+        self.assertIsNone(self.cache(refresh=True).get('host.get', {}))
+
+    def test_lru(self):
+        cache = self.cache()
+        cache.put('host.get', {'n': 1}, ["a" * 100])
+        size = os.path.getsize(cache.file('host.get', {'n': 1}))
+        cache = self.cache(max_size=int(size * 2.5))
+        cache.put('host.get', {'n': 2}, ["b" * 100])
+        os.utime(cache.file('host.get', {'n': 1}), (1000, 1000))
+        os.utime(cache.file('host.get', {'n': 2}), (2000, 2000))
+        # Чтение обновляет время использования: вытесняется второй результат
+        self.assertIsNotNone(cache.get('host.get', {'n': 1}))
+        cache.put('host.get', {'n': 3}, ["c" * 100])
+        self.assertIsNotNone(cache.get('host.get', {'n': 1}))
+        self.assertIsNone(cache.get('host.get', {'n': 2}))
+        self.assertIsNotNone(cache.get('host.get', {'n': 3}))
+
+    def test_directory_is_scanned_to_evict(self):
+        cache = self.cache(max_size=1024 * 1024)
+        with mock.patch('slib3.cache.os.scandir', wraps=os.scandir) as scandir:
+            for n in range(20):
+                cache.put('host.get', {'n': n}, [n])
+            cache.put('host.get', {'n': 0}, [0])
+        self.assertEqual(scandir.call_count, 1)
+        cache = self.cache(max_size=1)
+        cache.put('host.get', {'n': 20}, [20])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from slib3.cassette import Cassette, cassette_path
+
+
+def request(method, params, auth=None):
+    return json.dumps({'jsonrpc': "2.0", 'method': method, 'params': params, 'auth': auth, 'id': 1})
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class CassetteTest(unittest.TestCase):
+    def test_path_per_section(self):
+        self.assertEqual(cassette_path("/tmp", "linux", "http://zabbix/"),
+                         cassette_path("/tmp", "linux", "http://zabbix"))
+        self.assertNotEqual(cassette_path("/tmp", "linux", "http://zabbix"),
+                            cassette_path("/tmp", "windows", "http://zabbix"))
+
+    def test_key_without_credentials(self):
+        _, key = Cassette.key(request('user.login', {'username': "admin", 'password': "secret"}))
+        _, other = Cassette.key(request('user.login', {'username': "guest", 'password': "other"}))
+        self.assertEqual(key, other)
+        _, key = Cassette.key(request('host.get', {'output': ["hostid"]}, auth="a"))
+        _, other = Cassette.key(request('host.get', {'output': ["hostid"]}, auth="b"))
+        self.assertEqual(key, other)
+
+    def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cassette.jsonl.gz')
+            cassette = Cassette(path)
+            self.assertTrue(cassette.open())
+            cassette.put(request('user.login', {'username': "admin", 'password': "secret"}), b'{"result":"1"}')
+            cassette.put(request('host.get', {}), b'{"result":[]}')
+            cassette.put(request('host.get', {}), b'{"result":\n[{"hostid":"1"}]}')
+            cassette.close()
+            with gzip.open(path, 'rb') as f:
+                self.assertNotIn(b"secret", f.read())
+            # __________________________________________________________________
+            cassette = Cassette(path, replay=True)
+            self.assertTrue(cassette.open())
+            self.assertEqual(cassette.get(request('user.login', {'username': "admin", 'password': "x"})),
+                             b'{"result":"1"}')
+            self.assertEqual(cassette.get(request('host.get', {})), b'{"result":[]}')
+            self.assertEqual(json.loads(cassette.get(request('host.get', {}))), {'result': [{'hostid': "1"}]})
+            self.assertEqual(json.loads(cassette.get(request('host.get', {}))), {'result': [{'hostid': "1"}]})
+            self.assertIsNone(cassette.get(request('item.get', {})))
+            cassette.close()
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import unittest
+
+from slib3.exclude import Exclusions, exclude_compile
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class ExcludeCompileTest(unittest.TestCase):
+    def test_combined(self):
+        regex = exclude_compile([r'^vfs\.fs\.', r'^net\.if\.'])
+        self.assertTrue(regex.search("net.if.in[eth0]"))
+        self.assertTrue(regex.search("vfs.fs.size[/,free]"))
+        self.assertFalse(regex.search("system.cpu.load"))
+
+    def test_global_flag_is_not_shared(self):
+        # Флаг (?i) первого шаблона не должен действовать на второй
+        regex = exclude_compile(['(?i)^vfs', '^NET'])
+        self.assertTrue(regex.search("VFS.fs.size"))
+        self.assertTrue(regex.search("NET.if.in"))
+        self.assertFalse(regex.search("net.if.in"))
+
+    def test_scoped_flag_is_combined(self):
+        regex = exclude_compile(['(?i:^vfs)', '^NET'])
+        self.assertTrue(regex.search("VFS.fs.size"))
+        self.assertFalse(regex.search("net.if.in"))
+
+    def test_backreference_is_not_renumbered(self):
+        # В объединенном выражении \1 второго шаблона ссылался бы на группу первого
+        regex = exclude_compile([r'^(a)\1', r'^x(y)\1$'])
+        self.assertTrue(regex.search("xyy"))
+        self.assertTrue(regex.search("aa"))
+        self.assertFalse(regex.search("xy"))
+        regex = exclude_compile([r'^(?P<a>a)(?P=a)', r'^x(?P<y>y)(?P=y)$', r'^\\1'])
+        self.assertTrue(regex.search("xyy"))
+        self.assertTrue(regex.search("\\1"))
+
+    def test_exclusions(self):
+        exclusions = Exclusions(ids=[10], patterns=['(?i)^vfs', '^NET'], errors=["Unsupported item key"])
+        self.assertTrue(exclusions.match("10", "system.cpu.load"))
+        self.assertTrue(exclusions.match(11, "system.cpu.load", "unsupported item key."))
+        self.assertFalse(exclusions.match(11, "net.if.in"))
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import http.client
+import time
+import unittest
+
+from slib3.guard import Guard
+from slib3.zabbix import zabbix_query
+from slib3.zapi import ZabbixAPIException
+
+
+class FakeServer(object):
+    """
+    Server of zabbix_query: answers with the queued responses, exceptions are raised.
+    """
+
+    def __init__(self, guard, responses):
+        self.guard = guard
+        self.cache = None
+        self.responses = list(responses)
+        self.requests = 0
+
+    @staticmethod
+    def json_obj(method, params):
+        return '{{"method": "{}"}}'.format(method).encode('utf-8')
+
+    def post_request(self, json_obj, info=None, timeout=None):
+        self.requests += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class GuardTest(unittest.TestCase):
+    def test_delay(self):
+        guard = Guard(backoff=1.0, backoff_max=5.0)
+        for attempt, limit in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)):
+            for _ in range(50):
+                self.assertTrue(0.0 <= guard.delay(attempt) <= limit)
+
+    def test_breaker(self):
+        guard = Guard(breaker_threshold=2, breaker_cooldown=0.05)
+        guard.failure()
+        self.assertTrue(guard.allow())
+        guard.failure()
+        # Открыт: запросы отклоняются до конца паузы
+        self.assertFalse(guard.allow())
+        time.sleep(0.06)
+        # Полуоткрыт: только один пробный запрос
+        self.assertTrue(guard.allow())
+        self.assertFalse(guard.allow())
+        guard.success()
+        self.assertTrue(guard.allow())
+        self.assertTrue(guard.allow())
+        self.assertEqual(guard.counts(), {'retries': 0, 'failures': 2, 'rejected': 2, 'trips': 1})
+
+    def test_trial_failure(self):
+        guard = Guard(breaker_threshold=1, breaker_cooldown=0.05)
+        guard.failure()
+        time.sleep(0.06)
+        self.assertTrue(guard.allow())
+        guard.failure()
+        self.assertFalse(guard.allow())
+        self.assertEqual(guard.counts()['trips'], 2)
+
+    def test_trial_release(self):
+        guard = Guard(breaker_threshold=1, breaker_cooldown=0.05)
+        guard.failure()
+        time.sleep(0.06)
+        self.assertTrue(guard.allow())
+        guard.release()
+        self.assertTrue(guard.allow())
+
+
+class QueryTest(unittest.TestCase):
+    def test_retry(self):
+        guard = Guard(attempts=3, backoff=0.001)
+        server = FakeServer(guard, [http.client.RemoteDisconnected("closed"), TimeoutError("timed out"),
+                                    {'result': [1]}])
+        self.assertEqual(zabbix_query(server, "host.get", {}), [1])
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(guard.counts(), {'retries': 2, 'failures': 2, 'rejected': 0, 'trips': 0})
+
+    def test_attempts_exhausted(self):
+        guard = Guard(attempts=2, backoff=0.001)
+        server = FakeServer(guard, [TimeoutError("timed out")] * 2)
+        self.assertIsNone(zabbix_query(server, "host.get", {}))
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(guard.counts()['retries'], 1)
+
+    def test_api_error_is_not_retried(self):
+        guard = Guard(attempts=3, backoff=0.001)
+        server = FakeServer(guard, [{'error': {'code': -32602, 'message': "Invalid params."}}])
+        self.assertIsNone(zabbix_query(server, "host.get", {}))
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(guard.counts()['failures'], 0)
+
+    def test_trial_released_on_api_exception(self):
+        guard = Guard(attempts=1, breaker_threshold=1, breaker_cooldown=0.05)
+        server = FakeServer(guard, [TimeoutError("timed out"), ZabbixAPIException("NOT logged in"),
+                                    {'result': [1]}])
+        self.assertIsNone(zabbix_query(server, "host.get", {}))
+        # Открыт: запрос отклонен без обращения к серверу
+        self.assertIsNone(zabbix_query(server, "host.get", {}))
+        self.assertEqual(server.requests, 1)
+        time.sleep(0.06)
+        # Пробный запрос завершился исключением клиента, следующий вызов снова пробный
+        self.assertIsNone(zabbix_query(server, "host.get", {}))
+        self.assertEqual(zabbix_query(server, "host.get", {}), [1])
+        self.assertTrue(guard.allow())
+        self.assertTrue(guard.allow())
+        self.assertEqual(guard.counts()['trips'], 1)
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
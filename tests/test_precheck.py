@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import unittest
+
+from zabbix_check_status import check_host_precheck
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class HostPrecheckTest(unittest.TestCase):
+    def test_maintenance(self):
+        self.assertEqual(check_host_precheck({'maintenance_status': "1", 'available': "1"}), "in maintenance")
+
+    def test_host_fields(self):
+        # До Zabbix 5.4 доступность хранится в полях узла сети
+        self.assertIsNone(check_host_precheck({'maintenance_status': "0", 'available': "1", 'snmp_available': "0"}))
+        self.assertIsNone(check_host_precheck({'available': "0", 'snmp_available': "0"}))
+        self.assertIsNone(check_host_precheck({'available': "1", 'snmp_available': "2"}))
+        self.assertEqual(check_host_precheck({'available': "2", 'error': "timeout", 'snmp_available': "0"}),
+                         "unreachable: agent unavailable (timeout)")
+        self.assertEqual(check_host_precheck({'available': "2", 'snmp_available': "2", 'snmp_error': "no response"}),
+                         "unreachable: SNMP, agent unavailable (no response)")
+
+    def test_interfaces(self):
+        host = {'maintenance_status': "0", 'interfaces': [{'type': "1", 'available': "2", 'error': ""},
+                                                          {'type': "4", 'available': "2", 'error': "refused"}]}
+        self.assertEqual(check_host_precheck(host), "unreachable: JMX, agent unavailable (refused)")
+        host['interfaces'].append({'type': "2", 'available': "1", 'error': ""})
+        self.assertIsNone(check_host_precheck(host))
+        self.assertIsNone(check_host_precheck({'interfaces': []}))
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import tempfile
+import unittest
+
+from slib3.state import State
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class StateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state = State(os.path.join(self.tmp.name, 'state.db'))
+        self.assertTrue(self.state.open())
+
+    def tearDown(self):
+        self.state.close()
+        self.tmp.cleanup()
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.state.last_run('zabbix'))
+        self.state.save('zabbix', 10, {('item', 1): {'text': "item 1"}})
+        self.assertEqual(self.state.load('zabbix'), {})
+        self.assertTrue(self.state.commit('zabbix'))
+        self.assertEqual(self.state.load('zabbix'), {10: {('item', 1): {'text': "item 1"}}})
+        self.assertIsNotNone(self.state.last_run('zabbix'))
+
+    def test_retain(self):
+        self.state.save('zabbix', 10, {('item', 1): {'text': "item 1"}})
+        self.state.save('zabbix', 11, {('trigger', 2): {'text': "trigger 2"}})
+        self.assertTrue(self.state.commit('zabbix'))
+        self.state.retain('zabbix', [11])
+        self.assertTrue(self.state.commit('zabbix'))
+        self.assertEqual(list(self.state.load('zabbix')), [11])
+
+    def test_sections_of_one_server(self):
+        # Две секции одного сервера с разными группами хостов не удаляют состояние друг друга
+        self.state.save('linux', 10, {('item', 1): {'text': "item 1"}})
+        self.state.retain('linux', [10])
+        self.assertTrue(self.state.commit('linux'))
+        self.state.save('windows', 20, {('item', 2): {'text': "item 2"}})
+        self.state.retain('windows', [20])
+        self.assertTrue(self.state.commit('windows'))
+        self.assertEqual(self.state.load('linux'), {10: {('item', 1): {'text': "item 1"}}})
+        self.assertEqual(self.state.load('windows'), {20: {('item', 2): {'text': "item 2"}}})
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# 18.10.2026
+# ----------------------------------------------------------------------------------------------------------------------
+import gzip
+import http.client
+import io
+import unittest
+import zlib
+
+from slib3.zapi import HTTPConnectionPool, ZabbixAPIException
+
+BODY = b'{"jsonrpc": "2.0", "result": [' + b', '.join(b'{"hostid": "%d"}' % x for x in range(1000)) + b'], "id": 1}'
+
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, data, encoding=None, will_close=False):
+        super().__init__(data)
+        self.headers = {'Content-Encoding': encoding} if encoding else dict()
+        self.status = 200
+        self.reason = "OK"
+        self.will_close = will_close
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class FakeConnection(object):
+    """
+    Connection answering with the response, or raising the error when error is set (the server closed it).
+    """
+
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.requests = 0
+        self.closed = False
+        self.sock = None
+        self.timeout = None
+
+    def request(self, method, path, body, headers):
+        self.requests += 1
+        if self.error is not None:
+            raise self.error
+
+    def getresponse(self):
+        return self.response
+
+    def close(self):
+        self.closed = True
+
+
+def deflate(data, wbits):
+    compressor = zlib.compressobj(wbits=wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+class ReadTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = HTTPConnectionPool("http://zabbix/api_jsonrpc.php")
+        # Маленький блок: ответ читается и распаковывается по частям
+        self.pool._CHUNK_SIZE = 64
+
+    def test_identity(self):
+        self.assertEqual(self.pool._read(FakeResponse(BODY)), (BODY, len(BODY)))
+
+    def test_gzip(self):
+        for encoding in ('gzip', 'x-gzip', ' GZIP '):
+            data = gzip.compress(BODY)
+            self.assertEqual(self.pool._read(FakeResponse(data, encoding)), (BODY, len(data)))
+
+    def test_deflate(self):
+        # zlib по RFC и "сырой" deflate без заголовка, который отправляют некоторые серверы
+        for wbits in (zlib.MAX_WBITS, -zlib.MAX_WBITS):
+            data = deflate(BODY, wbits)
+            self.assertEqual(self.pool._read(FakeResponse(data, 'deflate')), (BODY, len(data)))
+
+    def test_unsupported(self):
+        with self.assertRaises(ZabbixAPIException):
+            self.pool._read(FakeResponse(BODY, 'br'))
+
+
+class RequestTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = HTTPConnectionPool("http://zabbix/api_jsonrpc.php", compression=False)
+        self.connections = []
+        self.pool._connect = self.connect
+
+    def connect(self):
+        conn = self.connections.pop(0)
+        self.pool.connections_opened += 1
+        return conn
+
+    def test_reuse(self):
+        first = FakeConnection(FakeResponse(BODY))
+        self.connections = [first]
+        self.assertEqual(self.pool.request(BODY, {}), (200, "OK", BODY, len(BODY)))
+        first.response = FakeResponse(BODY)
+        self.assertEqual(self.pool.request(BODY, {})[2], BODY)
+        self.assertEqual((self.pool.connections_opened, self.pool.connections_reused), (1, 1))
+        self.assertEqual(first.requests, 2)
+
+    def test_stale_connection(self):
+        # Сервер закрыл простаивающее соединение: запрос повторяется через новое
+        stale = FakeConnection(FakeResponse(BODY))
+        fresh = FakeConnection(FakeResponse(BODY, will_close=True))
+        self.connections = [stale, fresh]
+        self.pool.request(BODY, {})
+        stale.error = http.client.RemoteDisconnected("Remote end closed connection without response")
+        self.assertEqual(self.pool.request(BODY, {})[2], BODY)
+        self.assertTrue(stale.closed)
+        self.assertEqual((stale.requests, fresh.requests), (2, 1))
+        # Ответ с Connection: close - соединение не возвращается в пул
+        self.assertTrue(fresh.closed)
+
+    def test_new_connection_error(self):
+        # Ошибка нового соединения не повторяется
+        conn = FakeConnection(error=ConnectionResetError("reset"))
+        self.connections = [conn]
+        with self.assertRaises(ConnectionResetError):
+            self.pool.request(BODY, {})
+        self.assertTrue(conn.closed)
+        self.assertEqual(conn.requests, 1)
+
+
+# %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+if __name__ == '__main__':
+    unittest.main()
@@ -3,17 +3,36 @@
 # 29.09.2020
 # ----------------------------------------------------------------------------------------------------------------------
 import argparse
+import concurrent.futures
 import configparser
+import functools
+import io
+import multiprocessing
 import os
+import random
 import re
 import signal
 import ssl
 import sys
 import tempfile
+import threading
+import time
 
+from slib3.cache import Cache
+from slib3.cassette import Cassette, cassette_path
+from slib3.codec import codec
+from slib3.exclude import Exclusions, exclude_ids, exclude_lines
 from slib3.fs import fs_rm_file
-from slib3.kb import kb_confirm
+from slib3.guard import Guard
+from slib3.metrics import metrics
 from slib3.pid import pid_mk_file
+from slib3.pool import pool_imap
+from slib3.records import Item, LLDRule, Trigger, records_consume
+from slib3.remediate import Remediation
+from slib3.rollup import Rollup
+from slib3.report import reporter
+from slib3.state import State
+from slib3.stats import stats
 from slib3.zabbix import *
 
 # noinspection PyProtectedMember
@@ -22,6 +41,19 @@ ssl._create_default_https_context = ssl._create_unverified_context
 _TRIGGER_EXCLUDE_ERRORS = (
     "no status update so far", "processes started", "agent is unavailable", "item is disabled",
     ": item is not supported.", ": not enough data.", ": cannot get values from value cache.")
+# Поля объектов, которые используются проверками
+_LLD_RULE_OUTPUT = ["itemid", "hostid", "name", "key_", "error", "status", "state"]
+_ITEM_OUTPUT = ["itemid", "hostid", "name", "key_", "error", "status", "state"]
+_TRIGGER_OUTPUT = ["triggerid", "description", "error", "status", "state"]
+# Типы интерфейсов узла сети и поля доступности узла сети до Zabbix 5.4: (available, error, тип интерфейса)
+_INTERFACE_TYPES = {1: "agent", 2: "SNMP", 3: "IPMI", 4: "JMX"}
+_HOST_AVAILABILITY_FIELDS = (("available", "error", 1), ("snmp_available", "snmp_error", 2),
+                             ("ipmi_available", "ipmi_error", 3), ("jmx_available", "jmx_error", 4))
+# Методы с редко изменяемыми результатами, которые читаются из кэша (cache_ttl)
+_CACHED_METHODS = ("apiinfo.version", "hostgroup.get", "host.get")
+# Режим демона: флаги выставляются обработчиком сигналов, событие прерывает ожидание следующей проверки
+_daemon_flags = {'stop': False, 'reload': False}
+_daemon_wakeup = threading.Event()
 
 
 def main():
@@ -35,10 +67,55 @@ def main():
                             metavar='<SERVER>', help="specified server from config")
         parser.add_argument("host", action='store', default=None, nargs='?',
                             metavar='<HOST>', help="specified host from zabbix")
+        parser.add_argument('-c', '--config', action='store', default=None,
+                            metavar='<PATH>', help="configuration file (default: config.ini next to the script)")
         parser.add_argument('-i', '--interactive', action='store_true', default=False,
                             help="interactive mode")
         parser.add_argument('--colorama-disabled', action='store_true', default=False,
                             help="turn off color output")
+        parser.add_argument('-b', '--bulk-size', action='store', type=int, default=None,
+                            metavar='<N>', help="number of hosts per request (overrides bulk_size)")
+        parser.add_argument('-w', '--workers', action='store', type=int, default=None,
+                            metavar='<N>', help="number of concurrent requests (overrides workers)")
+        parser.add_argument('--page-size', action='store', type=int, default=None,
+                            metavar='<N>', help="number of items/triggers per request (overrides page_size)")
+        parser.add_argument('-p', '--parallel', action='store', type=int, default=1,
+                            metavar='<N>', help="number of servers checked in parallel")
+        parser.add_argument('-d', '--daemon', action='store_true', default=False,
+                            help="stay resident and check every server on its interval (see interval/jitter)")
+        parser.add_argument('--rollup', action='store_true', default=False,
+                            help="group broken inherited items/triggers by the parent template object")
+        parser.add_argument('--auto-disable', action='store_true', default=False,
+                            help="disable broken items/triggers matching the auto_disable_* rules without confirmation")
+        parser.add_argument('-f', '--format', action='store', default='text', choices=['text', 'jsonl', 'csv'],
+                            help="output format, jsonl/csv: a record per broken object or skipped host in stdout, "
+                                 "log in stderr")
+        parser.add_argument('--full-scan', action='store_true', default=False,
+                            help="get all objects and check their status on the client side")
+        parser.add_argument('--state-db', action='store', default=None,
+                            metavar='<PATH>', help="state database of the last run (overrides state_db)")
+        parser.add_argument('--changes-only', action='store_true', default=False,
+                            help="report only objects broken or recovered since the last run")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--no-cache', action='store_true', default=False,
+                           help="do not read or write the cache of API results (cache_dir)")
+        group.add_argument('--refresh', action='store_true', default=False,
+                           help="request the cached API results from the server and update the cache")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--record', action='store', default=None,
+                           metavar='<DIR>', help="record API responses to the directory")
+        group.add_argument('--replay', action='store', default=None,
+                           metavar='<DIR>', help="answer API requests from the recorded responses, without network")
+        parser.add_argument('--json-codec', action='store', default='auto', choices=('auto',) + codec.BACKENDS,
+                            help="JSON backend of the API client (default: the fastest installed)")
+        parser.add_argument('--profile', action='store_true', default=False,
+                            help="print wall time of the work phases and API call statistics")
+        parser.add_argument('--profile-json', action='store', default=None,
+                            metavar='<PATH>', help="write the profile to a JSON file")
+        parser.add_argument('--metrics-file', action='store', default=None,
+                            metavar='<PATH>', help="write Prometheus metrics to the file (textfile collector)")
+        parser.add_argument('--metrics-listen', action='store', default=None,
+                            metavar='<[HOST:]PORT>', help="serve Prometheus metrics on /metrics in daemon mode")
         parser.add_argument('-v', '--verbose', action='count',
                             help="verbose mode")
         parser.add_argument('--test', action='store_true', default=False,
@@ -47,20 +124,22 @@ def main():
     except SystemExit:
         return False
     # __________________________________________________________________________
-    # verbose
-    if args.verbose:
-        log.setup(level=log.DEBUG1)
-        if args.verbose > 1:
-            log.setup(level=log.DEBUG2)
-    # colorama disabled
-    if args.colorama_disabled:
-        log.setup(colorama_enabled=False)
+    log_setup(args)
+    if args.daemon and (args.interactive or args.test or args.record or args.replay):
+        log.e("Daemon mode is not compatible with options: --interactive, --test, --record, --replay")
+        return False
+    if args.metrics_listen and not args.daemon:
+        log.e("Option is available in daemon mode only: --metrics-listen")
+        return False
     # __________________________________________________________________________
     # read configuration file
     try:
         self_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
+        config_path = args.config or os.path.join(self_dir, 'config.ini')
         config_ini = configparser.ConfigParser()
-        config_ini.read(os.path.join(self_dir, 'config.ini'))
+        if not config_ini.read(config_path) and args.config:
+            log.e("Failed to read configuration file: '{}'".format(config_path))
+            return False
     except Exception as err:
         log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
         return False
@@ -79,224 +158,1028 @@ def main():
     # ==================================================================================================================
     # Start of the work cycle
     # ==================================================================================================================
-    # WARNING: В цикле не использовать return
-    for job in [x for x in config_ini.sections() if x != 'default']:
-        # Только выбранный сервер
-        if args.server and job.lower() != args.server.lower():
-            continue
-        log.s("=" * 95)
-        log.s("-=*=-{}-=*=-".format(job.rjust(42 + int(len(job) / 2)).ljust(85).upper()))
-        log.s("-" * 95)
-        config_job = {
-            'zdx_host': None,
-            'zdx_user': None,
-            'zdx_pass': None,
-            'exclude_item_ids': [],
-            'exclude_item_re': None,
-            'exclude_trigger_ids': [],
-            'exclude_trigger_re': None,
-            'include_host_groups': set(),
-            'interactive': False,
-        }
-        # config default
-        for x in config_job:
-            try:
-                if config_ini['default'][x]:
-                    config_job[x] = config_ini['default'][x]
-            except KeyError:
-                pass
-            except Exception as err:
-                log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
-                return_value = False
-                continue
-        # config job
-        for x in config_job:
-            try:
-                if config_ini[job][x]:
-                    config_job[x] = config_ini[job][x]
-            except KeyError:
-                pass
-            except Exception as err:
-                log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+    jobs = [x for x in config_ini.sections() if x != 'default']
+    # Только выбранный сервер
+    if args.server:
+        jobs = [x for x in jobs if x.lower() == args.server.lower()]
+    run_start = time.perf_counter()
+    if args.daemon:
+        return_value = daemon_run(config_path, config_ini, args)
+    elif args.parallel > 1 and len(jobs) > 1 and not args.interactive:
+        # Серверы проверяются в отдельных процессах, вывод каждого печатается одним блоком
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(args.parallel, len(jobs))) as executor:
+            futures = [executor.submit(job_run_buffered, job, config_ini, args) for job in jobs]
+            for future in futures:
+                try:
+                    job_return_value, job_output, job_report_output, job_stats, job_metrics = future.result()
+                except Exception as err:
+                    log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+                    return_value = False
+                    continue
+                log_stream = sys.stderr if reporter.enabled else sys.stdout
+                log_stream.write(job_output)
+                log_stream.flush()
+                if reporter.enabled:
+                    reporter.write_raw(job_report_output)
+                    reporter.flush()
+                stats.merge(job_stats)
+                metrics.merge(job_metrics)
+                if not job_return_value:
+                    return_value = False
+    else:
+        for job in jobs:
+            if not job_run(job, config_ini, args):
                 return_value = False
-                continue
-        # zdx_*
-        if not isinstance(config_job['zdx_host'], str):
-            log.e("Invalid value for parameter: zdx_host")
-            continue
+    stats.add_phase('run', time.perf_counter() - run_start)
+    # __________________________________________________________________________
+    # Метрики Prometheus
+    if args.metrics_file and not args.daemon and not metrics.write(args.metrics_file):
+        return_value = False
+    # __________________________________________________________________________
+    # Профилирование
+    if args.profile:
+        log.i("JSON codec :: {}".format(codec.name))
+        stats.report()
+    if args.profile_json and not stats.write_json(args.profile_json):
+        return_value = False
+    # ==================================================================================================================
+    # ==================================================================================================================
+    # Удаление PID файла
+    if not fs_rm_file(pid_file_path):
+        log.e("Failed to delete PID file: '{}'".format(pid_file_path))
+        return_value = False
+    # __________________________________________________________________________
+    return return_value
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def job_run(job, config_ini, args, buffered=False):
+    """
+    Check one server section of the configuration file.
+    """
+    log.s("=" * 95)
+    log.s("-=*=-{}-=*=-".format(job.rjust(42 + int(len(job) / 2)).ljust(85).upper()))
+    log.s("-" * 95)
+    config_job = job_config(job, config_ini, args, buffered=buffered)
+    if config_job is None:
+        return False
+    # __________________________________________________________________________
+    # Запись/воспроизведение ответов API
+    cassette = None
+    if args.record or args.replay:
+        cassette = Cassette(cassette_path(args.record or args.replay, config_job['job'], config_job['zdx_host']),
+                            replay=bool(args.replay))
+        if not cassette.open():
+            return False
+    # Состояние прошлого запуска
+    state = None
+    if config_job['state_db'] and not args.test:
+        state = State(config_job['state_db'])
+        if not state.open():
+            if cassette is not None:
+                cassette.close()
+            return False
+    # __________________________________________________________________________
+    try:
+        calls = stats.counts()
+        start = time.perf_counter()
+        with stats.phase('connect'):
+            zabbix_server = zabbix_connect(config_job['zdx_host'], config_job['zdx_user'], config_job['zdx_pass'],
+                                           token=config_job['zdx_token'], session_cache=config_job['session_cache'],
+                                           pool_size=config_job['workers'], cassette=cassette,
+                                           compression=config_job['compression'], guard=job_guard(config_job),
+                                           cache=job_cache(config_job, args))
+        if not zabbix_server:
+            job_scan_failed(config_job, time.perf_counter() - start, calls)
+            return False
+        if args.test:
+            log.i("Zabbix API connection successfully")
+            return_value = True
+        else:
+            with stats.phase('job'):
+                return_value = job_scan(zabbix_server, config_job, args, state=state)
+        # ______________________________________________________________________
+        log.d1("Connections :: opened: {}, reused: {}".format(zabbix_server.connections_opened,
+                                                              zabbix_server.connections_reused))
+        log.d1("Transfer :: received: {:.1f} KiB, decompressed: {:.1f} KiB".format(
+            zabbix_server.bytes_received / 1024.0, zabbix_server.bytes_decoded / 1024.0))
+        if zabbix_server.cache is not None:
+            log.d1("Cache :: hits: {}, misses: {}".format(zabbix_server.cache.hits, zabbix_server.cache.misses))
+        # Сессия без кэша завершается, чтобы не накапливать их на сервере
+        zabbix_disconnect(zabbix_server, logout=not config_job['zdx_token'] and not config_job['session_cache'])
+    finally:
+        if state is not None:
+            state.close()
+        if cassette is not None:
+            cassette.close()
+    # __________________________________________________________________________
+    return return_value
+
+
+def job_config(job, config_ini, args, buffered=False):
+    """
+    Parameters of the server section merged with the [default] section and command-line options.
+    Returns None if the configuration is invalid.
+    """
+    config_job = {
+        'zdx_host': None,
+        'zdx_user': None,
+        'zdx_pass': None,
+        'zdx_token': None,
+        'session_cache': None,
+        'cache_dir': None,
+        'cache_ttl': 3600,
+        'cache_ttl_lld': 0,
+        'cache_max_size': 64,
+        'metrics_max_hosts': 100,
+        'exclude_item_ids': set(),
+        'exclude_item_re': [],
+        'exclude_item_errors': [],
+        'exclude_trigger_ids': set(),
+        'exclude_trigger_re': [],
+        'exclude_trigger_errors': [],
+        'auto_disable_item_re': [],
+        'auto_disable_item_errors': [],
+        'auto_disable_trigger_re': [],
+        'auto_disable_trigger_errors': [],
+        'update_chunk_size': 100,
+        'include_host_groups': set(),
+        'interactive': False,
+        'compression': True,
+        'host_precheck': True,
+        'bulk_size': 1,
+        'workers': 1,
+        'page_size': 0,
+        'state_db': None,
+        'interval': 300,
+        'jitter': 0,
+        'timeout': 29,
+        'retries': 2,
+        'retry_backoff': 1.0,
+        'deadline': 120,
+        'max_concurrency': 0,
+        'max_rate': 0.0,
+        'breaker_threshold': 5,
+        'breaker_cooldown': 60,
+    }
+    # config default
+    for x in config_job:
+        try:
+            if config_ini['default'][x]:
+                config_job[x] = config_ini['default'][x]
+        except KeyError:
+            pass
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return None
+    # config job
+    for x in config_job:
+        try:
+            if config_ini[job][x]:
+                config_job[x] = config_ini[job][x]
+        except KeyError:
+            pass
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return None
+    # zdx_*
+    if not isinstance(config_job['zdx_host'], str):
+        log.e("Invalid value for parameter: zdx_host")
+        return None
+    if not isinstance(config_job['zdx_token'], str):
+        # API токен (Zabbix 5.4+) заменяет имя пользователя и пароль
         if not isinstance(config_job['zdx_user'], str):
             log.e("Invalid value for parameter: zdx_user")
-            continue
+            return None
         if not isinstance(config_job['zdx_pass'], str):
             log.e("Invalid value for parameter: zdx_pass")
+            return None
+    # exclude_*_ids
+    for x in ('exclude_item_ids', 'exclude_trigger_ids'):
+        if isinstance(config_job[x], str):
+            config_job[x] = exclude_ids(config_job[x])
+    # exclude_*_re, exclude_*_errors, auto_disable_*: по одному значению в строке
+    for x in ('exclude_item_re', 'exclude_item_errors', 'exclude_trigger_re', 'exclude_trigger_errors',
+              'auto_disable_item_re', 'auto_disable_item_errors', 'auto_disable_trigger_re',
+              'auto_disable_trigger_errors'):
+        if isinstance(config_job[x], str):
+            config_job[x] = exclude_lines(config_job[x])
+    # Правила исключения компилируются один раз
+    try:
+        config_job['exclude_items'] = Exclusions(config_job['exclude_item_ids'], config_job['exclude_item_re'],
+                                                 config_job['exclude_item_errors'])
+    except re.error:
+        log.e("Invalid value for parameter: exclude_item_re")
+        return None
+    try:
+        config_job['exclude_triggers'] = Exclusions(
+            config_job['exclude_trigger_ids'], config_job['exclude_trigger_re'],
+            _TRIGGER_EXCLUDE_ERRORS + tuple(config_job['exclude_trigger_errors']))
+    except re.error:
+        log.e("Invalid value for parameter: exclude_trigger_re")
+        return None
+    # auto_disable_*: правила только для типов, для которых они заданы
+    config_job['auto_disable'] = dict()
+    for kind in ('item', 'trigger'):
+        patterns = config_job['auto_disable_{}_re'.format(kind)]
+        errors = config_job['auto_disable_{}_errors'.format(kind)]
+        if not patterns and not errors:
             continue
-        # exclude_*_ids
-        if isinstance(config_job['exclude_item_ids'], str):
-            config_job['exclude_item_ids'] = filter(lambda x: x.isdigit(), config_job['exclude_item_ids'].split())
-        if isinstance(config_job['exclude_trigger_ids'], str):
-            config_job['exclude_trigger_ids'] = filter(lambda x: x.isdigit(), config_job['exclude_trigger_ids'].split())
-        # exclude_*_re
-        if isinstance(config_job['exclude_item_re'], str):
-            try:
-                config_job['exclude_item_re'] = re.compile(config_job['exclude_item_re'])
-            except re.error:
-                log.e("Invalid value for parameter: exclude_item_re")
-                continue
-        if isinstance(config_job['exclude_trigger_re'], str):
+        try:
+            config_job['auto_disable'][kind] = Exclusions(patterns=patterns, errors=errors)
+        except re.error:
+            log.e("Invalid value for parameter: auto_disable_{}_re".format(kind))
+            return None
+    if args.auto_disable and not config_job['auto_disable']:
+        log.w("No auto-disable rules for server :: {}".format(job))
+    # include_host_groups
+    if isinstance(config_job['include_host_groups'], str):
+        config_job['include_host_groups'] = set(map(lambda x: x.lower(), config_job['include_host_groups'].split()))
+    # interactive
+    if args.interactive or \
+            isinstance(config_job['interactive'], str) and \
+            config_job['interactive'].lower() in ('true', 'yes', 'on'):
+        config_job['interactive'] = True
+    if config_job['interactive'] is True and buffered:
+        log.w("Interactive mode is not available while servers are checked in parallel")
+        config_job['interactive'] = False
+    # compression, host_precheck
+    for x in ('compression', 'host_precheck'):
+        if isinstance(config_job[x], str):
+            if config_job[x].lower() not in ('true', 'yes', 'on', 'false', 'no', 'off'):
+                log.e("Invalid value for parameter: {}".format(x))
+                return None
+            config_job[x] = config_job[x].lower() in ('true', 'yes', 'on')
+    # bulk_size
+    if args.bulk_size is not None:
+        config_job['bulk_size'] = str(args.bulk_size)
+    if isinstance(config_job['bulk_size'], str):
+        if not config_job['bulk_size'].isdigit() or int(config_job['bulk_size']) < 1:
+            log.e("Invalid value for parameter: bulk_size")
+            return None
+        config_job['bulk_size'] = int(config_job['bulk_size'])
+    # workers
+    if args.workers is not None:
+        config_job['workers'] = str(args.workers)
+    if isinstance(config_job['workers'], str):
+        if not config_job['workers'].isdigit() or int(config_job['workers']) < 1:
+            log.e("Invalid value for parameter: workers")
+            return None
+        config_job['workers'] = int(config_job['workers'])
+    # update_chunk_size
+    if isinstance(config_job['update_chunk_size'], str):
+        if not config_job['update_chunk_size'].isdigit() or int(config_job['update_chunk_size']) < 1:
+            log.e("Invalid value for parameter: update_chunk_size")
+            return None
+        config_job['update_chunk_size'] = int(config_job['update_chunk_size'])
+    # page_size
+    if args.page_size is not None:
+        config_job['page_size'] = str(args.page_size)
+    if isinstance(config_job['page_size'], str):
+        if not config_job['page_size'].isdigit():
+            log.e("Invalid value for parameter: page_size")
+            return None
+        config_job['page_size'] = int(config_job['page_size'])
+    # cache_ttl, cache_ttl_lld, cache_max_size, metrics_max_hosts
+    for x in ('cache_ttl', 'cache_ttl_lld', 'cache_max_size', 'metrics_max_hosts'):
+        if isinstance(config_job[x], str):
+            if not config_job[x].isdigit():
+                log.e("Invalid value for parameter: {}".format(x))
+                return None
+            config_job[x] = int(config_job[x])
+    # timeout, retries, deadline, max_concurrency, breaker_threshold, breaker_cooldown
+    for x in ('timeout', 'retries', 'deadline', 'max_concurrency', 'breaker_threshold', 'breaker_cooldown'):
+        if isinstance(config_job[x], str):
+            if not config_job[x].isdigit() or x in ('timeout', 'deadline') and int(config_job[x]) < 1:
+                log.e("Invalid value for parameter: {}".format(x))
+                return None
+            config_job[x] = int(config_job[x])
+    # retry_backoff, max_rate
+    for x in ('retry_backoff', 'max_rate'):
+        if isinstance(config_job[x], str):
             try:
-                config_job['exclude_trigger_re'] = re.compile(config_job['exclude_trigger_re'])
-            except re.error:
-                log.e("Invalid value for parameter: exclude_trigger_re")
-                continue
-        # include_host_groups
-        if isinstance(config_job['include_host_groups'], str):
-            config_job['include_host_groups'] = set(map(lambda x: x.lower(), config_job['include_host_groups'].split()))
-        # interactive
-        if args.interactive or \
-                isinstance(config_job['interactive'], str) and \
-                config_job['interactive'].lower() in ('true', 'yes', 'on'):
-            config_job['interactive'] = True
-        # ______________________________________________________________________
-        zabbix_server = zabbix_connect(config_job['zdx_host'], config_job['zdx_user'], config_job['zdx_pass'])
-        if not zabbix_server:
+                config_job[x] = float(config_job[x])
+            except ValueError:
+                config_job[x] = -1.0
+            if config_job[x] < 0:
+                log.e("Invalid value for parameter: {}".format(x))
+                return None
+    # interval, jitter
+    for x in ('interval', 'jitter'):
+        if isinstance(config_job[x], str):
+            if not config_job[x].isdigit() or x == 'interval' and int(config_job[x]) < 1:
+                log.e("Invalid value for parameter: {}".format(x))
+                return None
+            config_job[x] = int(config_job[x])
+    config_job['job'] = job
+    # state_db
+    if args.state_db is not None:
+        config_job['state_db'] = args.state_db
+    if args.changes_only and not config_job['state_db']:
+        log.e("Parameter is required for --changes-only: state_db")
+        return None
+    # session_cache, cache_dir: ответы записываются и воспроизводятся, кэш не используется
+    if args.record or args.replay:
+        config_job['session_cache'] = None
+        config_job['cache_dir'] = None
+    if args.no_cache:
+        config_job['cache_dir'] = None
+    # __________________________________________________________________________
+    return config_job
+
+
+def job_scan(zabbix_server, config_job, args, state=None):
+    """
+    job_check() with the scan duration and API requests recorded for metrics.
+    """
+    calls = stats.counts()
+    guard = zabbix_server.guard.counts() if zabbix_server.guard else None
+    start = time.perf_counter()
+    metrics.scan_begin(config_job['job'])
+    return_value = job_check(zabbix_server, config_job, args, state=state)
+    # Повторы и срабатывания автомата защиты: неудачная проверка, если вызов так и не выполнен
+    if guard is not None:
+        guard = {k: v - guard[k] for k, v in zabbix_server.guard.counts().items()}
+        (log.w if any(guard.values()) else log.d1)(
+            "ZabbixAPI :: retries: {retries}, failed requests: {failures}, rejected: {rejected}, "
+            "circuit breaker trips: {trips}".format(**guard))
+        if guard['trips'] or guard['rejected'] or guard['failures'] > guard['retries']:
             return_value = False
+    if metrics.enabled:
+        metrics.scan_end(config_job['job'], time.perf_counter() - start, job_calls(calls))
+    # __________________________________________________________________________
+    return return_value
+
+
+def job_scan_failed(config_job, duration, calls) -> None:
+    """
+    Failed scan for metrics when the server is not connected: scan_success 0 and the failed login requests.
+    calls: stats.counts() before the connection.
+    """
+    if metrics.enabled:
+        metrics.scan_begin(config_job['job'])
+        metrics.scan_end(config_job['job'], duration, job_calls(calls), failed=True)
+    return None
+
+
+def job_calls(calls) -> dict:
+    """
+    API requests made since stats.counts() returned calls: {method: (requests, errors)}.
+    """
+    calls = {k: (v[0] - calls.get(k, (0, 0))[0], v[1] - calls.get(k, (0, 0))[1]) for k, v in stats.counts().items()}
+    return {k: v for k, v in calls.items() if v[0]}
+
+
+def job_check(zabbix_server, config_job, args, state=None):
+    """
+    Check discovery rules, items and triggers of the selected hosts of one server.
+    state: opened State, broken objects of the checked hosts are saved to it.
+    With --changes-only only objects broken or recovered since the last run are reported.
+    """
+    return_value = True
+    # __________________________________________________________________________
+    section = config_job['job']
+    last_broken = dict()
+    if state is not None:
+        if args.changes_only and state.last_run(section) is None:
+            log.w("No state of the last run, all broken objects are reported")
+        last_broken = state.load(section)
+        if last_broken is None:
+            return False
+    # __________________________________________________________________________
+    # Только выбранные группы хостов: имена групп без учета регистра преобразуются в groupids
+    groupids = None
+    if config_job['include_host_groups']:
+        with stats.phase('host groups'):
+            zabbix_groups = zabbix_hostgroup_get(zabbix_server, output=["groupid", "name"])
+        if zabbix_groups is None:
+            return False
+        groupids = [g['groupid'] for g in zabbix_groups if g['name'].lower() in config_job['include_host_groups']]
+        if not groupids:
+            log.w("No one host group found")
+            return return_value
+    # __________________________________________________________________________
+    # Только выбранный узел сети: сервер ищет по подстроке, точное совпадение проверяется ниже.
+    # Для предварительной проверки запрашиваются обслуживание и доступность: поля узла сети до Zabbix 5.4,
+    # интерфейсы начиная с 5.4
+    with stats.phase('hosts'):
+        host_output = ["hostid", "host", "name"]
+        precheck_output = list()
+        extend_interfaces = False
+        if config_job['host_precheck']:
+            version = zabbix_api_version(zabbix_server)
+            if version is None:
+                log.w("Host pre-check is disabled: unknown API version")
+            elif version < (5, 4):
+                precheck_output = ["maintenance_status"] + [x for f in _HOST_AVAILABILITY_FIELDS for x in f[:2]]
+            else:
+                precheck_output = ["maintenance_status"]
+                extend_interfaces = ["type", "available", "error"]
+        if zabbix_server.cache is None or not zabbix_server.cache.enabled("host.get"):
+            zabbix_hosts = zabbix_host_get(zabbix_server, output=host_output + precheck_output, search_name=args.host,
+                                           groupids=groupids, extend_groups=["name"],
+                                           extend_interfaces=extend_interfaces, status=0)
+        else:
+            # Список узлов сети из кэша, обслуживание и доступность запрашиваются отдельно без кэша
+            zabbix_hosts = zabbix_host_get(zabbix_server, output=host_output, search_name=args.host,
+                                           groupids=groupids, extend_groups=["name"], status=0)
+            if zabbix_hosts and precheck_output:
+                volatile = zabbix_host_get(zabbix_server, output=["hostid"] + precheck_output,
+                                           hostids=[h['hostid'] for h in zabbix_hosts],
+                                           extend_interfaces=extend_interfaces, cache=False, status=0)
+                if volatile is None:
+                    zabbix_hosts = None
+                else:
+                    # Узлы сети, удаленные или отключенные после записи в кэш, не проверяются
+                    volatile = {h['hostid']: h for h in volatile}
+                    zabbix_hosts = [dict(h, **volatile[h['hostid']]) for h in zabbix_hosts if h['hostid'] in volatile]
+    # status:
+    # 0 - (default) monitored host;
+    if zabbix_hosts is None:
+        log.e("Failed to get hosts")
+        return False
+    if not zabbix_hosts:
+        log.w("No one host found")
+        return return_value
+    selected_hosts = [h for h in zabbix_hosts if not args.host or h['name'].strip().lower() == args.host.lower()]
+    # __________________________________________________________________________
+    # Недоступные и находящиеся на обслуживании узлы сети не проверяются: одна строка и одна запись на узел сети.
+    # Сохраненные неисправные объекты не изменяются, причина недоступности хранится вместе с ними как объект 'host':
+    # с --changes-only строка печатается только при изменении причины, после проверки узел сети "восстановлен".
+    # Обслуживание плановое: не ошибка, в состоянии не хранится и с --changes-only не печатается
+    checked_hosts = list()
+    for h in selected_hosts:
+        skip = check_host_precheck(h)
+        if skip is None:
+            checked_hosts.append(h)
             continue
-        if args.test:
-            log.i("Zabbix API connection successfully")
+        hostid = int(h['hostid'])
+        last = last_broken.get(hostid, dict())
+        maintenance = skip == "in maintenance"
+        quiet = args.changes_only and (maintenance or last.get(('host', hostid), dict()).get('text') == skip)
+        (log.d1 if quiet else log.i if maintenance else log.w)("Skipped host: {} :: {}".format(h['name'], skip))
+        if reporter.enabled and not quiet:
+            reporter.write({'server': config_job['job'], 'host': h['name'], 'hostid': hostid, 'type': 'host',
+                            'id': hostid, 'name': h['name'], 'error': skip, 'skipped': True})
+        if maintenance:
             continue
-        # ______________________________________________________________________
-        zabbix_hosts = zabbix_host_get(zabbix_server, extend_groups=True, status=0)
-        # status:
-        # 0 - (default) monitored host;
-        if not zabbix_hosts:
-            log.warning("No one host found")
+        return_value = False
+        if state is not None:
+            broken = {k: v for k, v in last.items() if k[0] != 'host'}
+            broken[('host', hostid)] = {'text': skip, 'name': h['name'], 'error': skip}
+            state.save(section, hostid, broken)
+    reporter.flush()
+    # __________________________________________________________________________
+    # Общее число объектов для метрик: три запроса countOutput на сервер
+    if metrics.enabled and selected_hosts:
+        scope = {'hostids': [h['hostid'] for h in selected_hosts]} if args.host else \
+            {'groupids': groupids} if groupids else dict()
+        for kind, method in (('lld', "discoveryrule.get"), ('item', "item.get"), ('trigger', "trigger.get")):
+            total = zabbix_count(zabbix_server, method, monitored=True, **scope)
+            if total is not None:
+                metrics.set_total(config_job['job'], kind, total)
+        # По узлам сети: серии метрик на каждый узел сети, поэтому только для metrics_max_hosts узлов сети
+        if len(selected_hosts) <= config_job['metrics_max_hosts']:
+            names = {h['hostid']: h['name'] for h in selected_hosts}
+            for hostid, totals in (zabbix_count_by_host(zabbix_server, list(names)) or dict()).items():
+                for kind, total in totals.items():
+                    metrics.set_host_total(config_job['job'], names[hostid], kind, total)
+        else:
+            log.d1("Host totals are not exported :: hosts: {}, metrics_max_hosts: {}".format(
+                len(selected_hosts), config_job['metrics_max_hosts']))
+    # __________________________________________________________________________
+    # Отключение объектов: выбранные объекты отправляются пачками
+    remediation = None
+    if config_job['interactive'] or args.auto_disable and config_job['auto_disable']:
+        remediation = Remediation(zabbix_server, chunk_size=config_job['update_chunk_size'],
+                                  interactive=config_job['interactive'],
+                                  auto=config_job['auto_disable'] if args.auto_disable else None)
+    # Унаследованные объекты группируются по объекту шаблона
+    rollup = Rollup() if args.rollup else None
+    # __________________________________________________________________________
+    # Правила обнаружения, элементы данных и триггеры запрашиваются сразу для пачки узлов сети.
+    # Пачки запрашиваются параллельно, проверка и вывод выполняются по порядку в основном потоке.
+    chunks = [checked_hosts[x:x + config_job['bulk_size']]
+              for x in range(0, len(checked_hosts), config_job['bulk_size'])]
+    for chunk, host_objects in pool_imap(
+            lambda c: (c, zabbix_host_objects_get(zabbix_server, [int(h['hostid']) for h in c],
+                                                  broken_only=not args.full_scan, page_size=config_job['page_size'],
+                                                  rollup=args.rollup)),
+            chunks, config_job['workers']):
+        if host_objects is None:
+            log.e("Failed to get host objects :: hosts: {}".format(", ".join(h['name'] for h in chunk)))
+            return_value = False
             continue
-        # ______________________________________________________________________
-        for h in zabbix_hosts:
-            # Только выбранный узел сети
-            if args.host and h['name'].strip().lower() != args.host.lower():
-                continue
-            # Только выбранные группы хостов
-            host_groups = set(map(lambda x: x['name'].lower(), h['groups']))
-            if config_job['include_host_groups'] and not config_job['include_host_groups'] & host_groups:
-                continue
-            log.s("---->{}<----".format(h['name'].rjust(42 + int(len(h['name']) / 2)).ljust(85).upper()))
+        for h in chunk:
+            hostid = int(h['hostid'])
+            # Без заголовков узлов сети: в отчете только изменения, строки начинаются с имени узла сети
+            if not args.changes_only:
+                log.s("---->{}<----".format(h['name'].rjust(42 + int(len(h['name']) / 2)).ljust(85).upper()))
             # ##################################################################
             # Хост должен состоять в группе "_all"
             # if not filter(lambda x: x['name'].lower() == '_all', h['groups']):
             #    log.info("Host not a member of the group '_all'")
             #    main_return_value = False
             # ##################################################################
-            # __________________________________________________________________
-            # Проверка правил обнаружения
-            log.d1("Checking discovery rules: ...")
-            zabbix_lld_rules = zabbix_discoveryrule_get(zabbix_server, int(h['hostid']))
-            log.d1("...   total: {}".format(len(zabbix_lld_rules)))
-            for d in zabbix_lld_rules:
-                lld_info_str = "itemid={} name='{}' key='{}' error='{}'".format(d['itemid'], d['name'].encode('utf-8'),
-                                                                                d['key_'].encode('utf-8'),
-                                                                                d['error'].encode('utf-8'))
-                if int(d['status']) == 1:
-                    # status:
-                    # 0 - (default) enabled LLD rule;
-                    # 1 - disabled LLD rule;
-                    pass
-                elif int(d['state']) == 0:
-                    # state:
-                    # 0 - (default) normal;
-                    # 1 - not supported;
-                    pass
-                else:
-                    log.i("Broken: {}".format(lld_info_str))
+            broken = dict() if state is not None else None
+            known = last_broken.get(hostid, dict()) if args.changes_only else None
+            report = None
+            if reporter.enabled or metrics.enabled:
+                report = functools.partial(job_report, server=config_job['job'], host=h['name'], hostid=hostid,
+                                           groups=[g['name'] for g in h.get('groups', [])],
+                                           changes_only=args.changes_only)
+            with stats.phase('host'):
+                if not check_host(zabbix_server, config_job, known=known, broken=broken,
+                                  prefix="{}: ".format(h['name']) if args.changes_only else "", report=report,
+                                  remediation=remediation,
+                                  rollup=functools.partial(rollup.add, host=h['name']) if rollup else None,
+                                  **host_objects[hostid]):
                     return_value = False
-            # __________________________________________________________________
-            # Проверка элементов данных
-            log.d1("Checking items: ...")
-            zabbix_items = zabbix_item_get(zabbix_server, int(h['hostid']))
-            log.d1("...   total: {}".format(len(zabbix_items)))
-            for i in zabbix_items:
-                item_info_str = "itemid={} name='{}' key='{}' error='{}'".format(i['itemid'], i['name'].encode('utf-8'),
-                                                                                 i['key_'].encode('utf-8'),
-                                                                                 i['error'].encode('utf-8'))
-                if int(i['status']) == 1:
-                    # status:
-                    # 0 - (default) enabled item;
-                    # 1 - disabled item;
-                    pass
-                elif int(i['state']) == 0:
-                    # state:
-                    # 0 - (default) normal;
-                    # 1 - not supported;
-                    pass
+            if state is not None:
+                if args.changes_only:
+                    for x in sorted(set(last_broken.get(hostid, dict())) - set(broken)):
+                        info = last_broken[hostid][x]
+                        if reporter.enabled:
+                            reporter.write({'server': config_job['job'], 'host': h['name'], 'hostid': hostid,
+                                            'type': x[0], 'id': x[1], 'name': info.get('name', ""),
+                                            'key': info.get('key', ""), 'error': info.get('error', ""),
+                                            'recovered': True})
+                        else:
+                            log.o("{}: Recovered: {}".format(h['name'], info['text']))
+                state.save(section, hostid, broken)
+        reporter.flush()
+    # __________________________________________________________________________
+    if rollup is not None:
+        rollup.report(zabbix_server, remediation=remediation)
+    if remediation is not None and not remediation.flush():
+        return_value = False
+    # __________________________________________________________________________
+    if state is not None:
+        if not args.host:
+            state.retain(section, [int(h['hostid']) for h in selected_hosts])
+        if not state.commit(section):
+            return_value = False
+    # __________________________________________________________________________
+    return return_value
+
+
+def job_report(record, server, host, hostid, groups, changes_only=False):
+    """
+    Broken or excluded object found by check_host(): counted for metrics and written as a record.
+    With --changes-only only newly broken objects are written.
+    """
+    metrics.add_object(server, host, groups, record['type'], excluded=record.get('excluded', False))
+    if reporter.enabled and (not changes_only or record.get('new') and not record.get('excluded')):
+        reporter.write(dict(record, server=server, host=host, hostid=hostid))
+
+
+def job_run_buffered(job, config_ini, args):
+    """
+    job_run() for a worker process: the output is collected and returned to be printed as one block.
+    An exception of the job is logged to its output, the output collected before it is returned too.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    log_setup(args)
+    stream = io.StringIO()
+    log.setup(stream=stream)
+    # Заголовок CSV печатает основной процесс
+    report_stream = io.StringIO()
+    reporter.setup(stream=report_stream, header=False)
+    stats.reset()
+    try:
+        return_value = job_run(job, config_ini, args, buffered=True)
+    except Exception as err:
+        log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+        return_value = False
+    # __________________________________________________________________________
+    return return_value, stream.getvalue(), report_stream.getvalue(), stats.dump(), metrics.dump()
+
+
+def daemon_run(config_path, config_ini, args):
+    """
+    Check every server section on its own interval until SIGTERM/SIGINT.
+    Sessions and connections are kept between the checks, SIGHUP reloads the configuration file: sessions of the
+    sections whose connection parameters did not change are kept.
+    """
+    signal.signal(signal.SIGINT, signal_handler_daemon)
+    signal.signal(signal.SIGTERM, signal_handler_daemon)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal_handler_daemon)
+    if not daemon_output_setup(config_ini):
+        return False
+    log.i("Daemon started :: pid: {}".format(os.getpid()))
+    metrics_server = None
+    if args.metrics_listen:
+        metrics_server = metrics.serve(args.metrics_listen)
+        if metrics_server is None:
+            return False
+    # __________________________________________________________________________
+    configs = dict()  # section -> config_job
+    sessions = dict()  # section -> (параметры подключения, zabbix_server)
+    schedule = dict()  # section -> time.monotonic() следующей проверки
+    reload = True
+    while True:
+        _daemon_wakeup.clear()
+        if _daemon_flags['stop']:
+            log.i("Stopping daemon")
+            break
+        # ______________________________________________________________________
+        # Чтение конфигурации: при старте и по SIGHUP
+        if _daemon_flags['reload']:
+            _daemon_flags['reload'] = False
+            log.i("Reloading configuration :: {}".format(config_path))
+            new_config_ini = configparser.ConfigParser()
+            try:
+                if new_config_ini.read(config_path):
+                    config_ini = new_config_ini
+                    reload = True
+                    daemon_output_setup(config_ini)
                 else:
-                    # __________________________________________________________
-                    # Исключение
-                    if i['itemid'] in config_job['exclude_item_ids'] or \
-                            (config_job['exclude_item_re'] and config_job['exclude_item_re'].search(i['key_'])):
-                        log.d1("Skipped :{}".format(item_info_str))
-                        continue
-                    # __________________________________________________________
-                    # Интерактивное отключение
-                    elif config_job['interactive'] and kb_confirm("Disable item: {}".format(item_info_str)):
-                        data = {"itemid": i['itemid'], "status": 1}
-                        if zabbix_item_update(zabbix_server, data):
-                            log.o("Item disabled")
-                    # __________________________________________________________
-                    # Печать
-                    else:
-                        log.i("Broken: {}".format(item_info_str))
-                        return_value = False
+                    log.e("Failed to read configuration file: '{}'".format(config_path))
+            except Exception as err:
+                log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+        if reload:
+            reload = False
+            jobs = [x for x in config_ini.sections() if x != 'default']
+            if args.server:
+                jobs = [x for x in jobs if x.lower() == args.server.lower()]
+            configs = {job: config_job for job, config_job in ((x, job_config(x, config_ini, args)) for x in jobs)
+                       if config_job is not None}
+            for job in list(sessions):
+                if job not in configs or sessions[job][0] != daemon_session_key(configs[job]):
+                    daemon_disconnect(configs.get(job), sessions.pop(job)[1])
+            for job in list(schedule):
+                if job not in configs:
+                    del schedule[job]
+            for job, config_job in configs.items():
+                schedule.setdefault(job, time.monotonic() + random.uniform(0, config_job['jitter']))
+            if not configs:
+                log.w("Nothing to do")
+        # ______________________________________________________________________
+        # Ожидание ближайшей проверки, сигналы прерывают ожидание
+        job = min(schedule, key=schedule.get) if schedule else None
+        delay = schedule[job] - time.monotonic() if job else None
+        if delay is None or delay > 0:
+            _daemon_wakeup.wait(delay)
+            continue
+        # ______________________________________________________________________
+        config_job = configs[job]
+        with stats.phase('job'):
+            daemon_check(job, config_job, sessions, args)
+        schedule[job] = time.monotonic() + config_job['interval'] + random.uniform(0, config_job['jitter'])
+    # __________________________________________________________________________
+    for job in list(sessions):
+        daemon_disconnect(configs.get(job), sessions.pop(job)[1])
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+    log.i("Daemon stopped")
+    return True
+
+
+def daemon_check(job, config_job, sessions, args):
+    """
+    One check of a server section in daemon mode, the session is created once and checked before reuse.
+    """
+    log.s("=" * 95)
+    log.s("-=*=-{}-=*=-".format(job.rjust(42 + int(len(job) / 2)).ljust(85).upper()))
+    log.s("-" * 95)
+    zabbix_server = sessions[job][1] if job in sessions else None
+    if zabbix_server is not None and not config_job['zdx_token']:
+        try:
+            session_valid = zabbix_server.check_authentication(zabbix_server.get_auth())
+        except Exception as err:
+            log.e("Failed to check ZabbixAPI session :: {}".format(err))
+            session_valid = False
+        if not session_valid:
+            log.w("ZabbixAPI session expired :: {}".format(config_job['zdx_host']))
+            zabbix_disconnect(sessions.pop(job)[1], logout=False)
+            zabbix_server = None
+    if zabbix_server is None:
+        calls = stats.counts()
+        start = time.perf_counter()
+        with stats.phase('connect'):
+            zabbix_server = zabbix_connect(config_job['zdx_host'], config_job['zdx_user'], config_job['zdx_pass'],
+                                           token=config_job['zdx_token'], session_cache=config_job['session_cache'],
+                                           pool_size=config_job['workers'], compression=config_job['compression'],
+                                           guard=job_guard(config_job), cache=job_cache(config_job, args))
+        if not zabbix_server:
+            job_scan_failed(config_job, time.perf_counter() - start, calls)
+            if not args.profile and not args.profile_json:
+                stats.reset()
+            if args.metrics_file:
+                metrics.write(args.metrics_file)
+            return False
+        sessions[job] = (daemon_session_key(config_job), zabbix_server)
+    # __________________________________________________________________________
+    state = None
+    if config_job['state_db']:
+        state = State(config_job['state_db'])
+        if not state.open():
+            return False
+    try:
+        return job_scan(zabbix_server, config_job, args, state=state)
+    finally:
+        if state is not None:
+            state.close()
+        # Без профилирования статистика нужна только для метрик последней проверки
+        if not args.profile and not args.profile_json:
+            stats.reset()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+
+
+def job_guard(config_job):
+    """
+    Call policy of the server: retries within the deadline of a call, request limits and circuit breaker.
+    """
+    return Guard(attempts=config_job['retries'] + 1, backoff=config_job['retry_backoff'],
+                 timeout=config_job['timeout'], deadline=config_job['deadline'],
+                 concurrency=config_job['max_concurrency'], rate=config_job['max_rate'],
+                 breaker_threshold=config_job['breaker_threshold'], breaker_cooldown=config_job['breaker_cooldown'])
+
+
+def job_cache(config_job, args):
+    """
+    Cache of the results of slow-changing methods of the server or None if cache_dir is not set.
+    Discovery rules are requested with their state, they are cached only with cache_ttl_lld.
+    """
+    if not config_job['cache_dir']:
+        return None
+    ttl = {method: config_job['cache_ttl'] for method in _CACHED_METHODS}
+    ttl['discoveryrule.get'] = config_job['cache_ttl_lld']
+    server = "{}\0{}\0{}".format(config_job['zdx_host'].rstrip('/'), config_job['zdx_user'], config_job['zdx_token'])
+    return Cache(config_job['cache_dir'], server, ttl, max_size=config_job['cache_max_size'] * 1024 * 1024,
+                 refresh=args.refresh)
+
+
+def daemon_session_key(config_job):
+    return tuple(config_job[x] for x in ('zdx_host', 'zdx_user', 'zdx_pass', 'zdx_token', 'workers', 'compression',
+                                         'timeout', 'retries', 'retry_backoff', 'deadline', 'max_concurrency',
+                                         'max_rate', 'breaker_threshold', 'breaker_cooldown', 'cache_dir',
+                                         'cache_ttl', 'cache_ttl_lld', 'cache_max_size'))
+
+
+def daemon_disconnect(config_job, zabbix_server):
+    logout = config_job is None or not config_job['zdx_token'] and not config_job['session_cache']
+    zabbix_disconnect(zabbix_server, logout=logout)
+
+
+def daemon_output_setup(config_ini):
+    """
+    Output of the daemon: the [default] output_file rotated by size, or the standard output.
+    Lines are prefixed with date and time.
+    """
+    output = {'output_file': None, 'output_max_bytes': '10485760', 'output_backups': '5'}
+    if config_ini.has_section('default'):
+        for x in output:
+            if config_ini['default'].get(x):
+                output[x] = config_ini['default'][x]
+    for x in ('output_max_bytes', 'output_backups'):
+        if not output[x].isdigit():
+            log.e("Invalid value for parameter: {}".format(x))
+            return False
+    # __________________________________________________________________________
+    if output['output_file']:
+        try:
+            log.setup(file=output['output_file'], max_bytes=int(output['output_max_bytes']),
+                      backup_count=int(output['output_backups']), colorama_enabled=False)
+        except Exception as err:
+            log.c("Exception :: {}\n{}".format(err, "".join(traceback.format_exc())))
+            return False
+    log.setup(datetime_enabled=True)
+    return True
+
+
+def log_setup(args):
+    # verbose
+    if args.verbose:
+        log.setup(level=log.DEBUG1)
+        if args.verbose > 1:
+            log.setup(level=log.DEBUG2)
+    # colorama disabled
+    if args.colorama_disabled:
+        log.setup(colorama_enabled=False)
+    # json codec
+    if not codec.setup(args.json_codec):
+        log.w("JSON backend is not installed: {}, used: {}".format(args.json_codec, codec.name))
+    # metrics: счетчики запросов API берутся из статистики вызовов
+    metrics.setup(enabled=bool(args.metrics_file or args.metrics_listen))
+    # profile
+    stats.setup(enabled=bool(args.profile or args.profile_json) or metrics.enabled)
+    # format: записи печатаются в stdout, журнал в stderr
+    reporter.setup(format=args.format)
+    if reporter.enabled:
+        log.setup(stream=sys.stderr)
+
+
+def zabbix_host_objects_get(zabbix_server, hostids, broken_only=True, page_size=0, rollup=False):
+    """
+    Get discovery rules, items and triggers of several hosts by three requests and group them by hostid.
+    The order of objects within a host is the same as for a single host request.
+    broken_only: the server returns only enabled objects with state "not supported"/"unknown".
+    page_size: items and triggers are requested by pages and grouped while the next page is requested.
+    Objects are kept as LLDRule/Item/Trigger records, the API dicts are released as they are converted.
+    rollup: templateid of items and triggers is requested.
+    """
+    templateid = ["templateid"] if rollup else []
+    host_objects = {x: {'lld_rules': [], 'items': [], 'triggers': []} for x in hostids}
+    # __________________________________________________________________________
+    with stats.phase('lld'):
+        zabbix_lld_rules = zabbix_discoveryrule_get(zabbix_server, hostids, output=_LLD_RULE_OUTPUT,
+                                                    broken_only=broken_only)
+        if zabbix_lld_rules is None:
+            return None
+        for d in records_consume(zabbix_lld_rules):
+            d = LLDRule(d)
+            host_objects[d.hostid]['lld_rules'].append(d)
+    # __________________________________________________________________________
+    with stats.phase('items'):
+        zabbix_items = zabbix_item_get(zabbix_server, hostids, output=_ITEM_OUTPUT + templateid,
+                                       broken_only=broken_only, page_size=page_size)
+        if zabbix_items is None:
+            return None
+        try:
+            for i in records_consume(zabbix_items):
+                i = Item(i)
+                host_objects[i.hostid]['items'].append(i)
+        except ZabbixAPIException as err:
+            log.e("ZabbixAPI Exception: {}".format(err.args[0]))
+            return None
+    # __________________________________________________________________________
+    # Триггер может относиться к нескольким узлам сети
+    with stats.phase('triggers'):
+        zabbix_triggers = zabbix_trigger_get(zabbix_server, hostids, output=_TRIGGER_OUTPUT + templateid,
+                                             extend_functions=False, extend_hosts=["hostid"], broken_only=broken_only,
+                                             page_size=page_size)
+        if zabbix_triggers is None:
+            return None
+        try:
+            for t in records_consume(zabbix_triggers):
+                t = Trigger(t)
+                for hostid in t.hostids:
+                    if hostid in host_objects:
+                        host_objects[hostid]['triggers'].append(t)
+        except ZabbixAPIException as err:
+            log.e("ZabbixAPI Exception: {}".format(err.args[0]))
+            return None
+    # __________________________________________________________________________
+    return host_objects
+
+
+def check_host_precheck(host):
+    """
+    Reason to skip the host or None: maintenance, or no interface is available and at least one is unavailable.
+    """
+    # maintenance_status:
+    # 0 - (default) no maintenance;
+    # 1 - maintenance in effect;
+    if str(host.get('maintenance_status', "0")) == "1":
+        return "in maintenance"
+    if 'interfaces' in host:
+        interfaces = [(int(x['type']), int(x['available']), x.get('error', ""))
+                      for x in host['interfaces'] if 'available' in x]
+    else:
+        interfaces = [(t, int(host[a]), host.get(e, "")) for a, e, t in _HOST_AVAILABILITY_FIELDS if a in host]
+    # available:
+    # 0 - (default) unknown;
+    # 1 - available;
+    # 2 - unavailable;
+    unavailable = [x for x in interfaces if x[1] == 2]
+    if not unavailable or any(x[1] == 1 for x in interfaces):
+        return None
+    errors = [x[2] for x in unavailable if x[2]]
+    return "unreachable: {} unavailable{}".format(
+        ", ".join(sorted({_INTERFACE_TYPES.get(x[0], str(x[0])) for x in unavailable})),
+        " ({})".format(errors[0]) if errors else "")
+
+
+def check_host(zabbix_server, config_job, lld_rules, items, triggers, known=None, broken=None, prefix="",
+               report=None, remediation=None, rollup=None):
+    """
+    known: {(kind, objectid): info} broken in the last run, such objects are reported only in verbose mode.
+    broken: dict filled with the broken objects of the host.
+    report: function called with a record of every broken or excluded object ('new' - not broken in the last run).
+    remediation: Remediation, broken items/triggers selected by it are queued for disabling instead of reported.
+    rollup: function called with a record and templateid of a broken inherited item/trigger, True if the object
+            is printed by the template rollup instead of the host; inherited objects are disabled on the template.
+    """
+    return_value = True
+    if remediation is not None:
+        remediation.host_begin(items=items, triggers=triggers)
+    # __________________________________________________________________________
+    # Проверка правил обнаружения
+    log.d1("Checking discovery rules: ...")
+    log.d1("...   total: {}".format(len(lld_rules)))
+    for d in lld_rules:
+        if d.status == 1:
+            # status:
+            # 0 - (default) enabled LLD rule;
+            # 1 - disabled LLD rule;
+            pass
+        elif d.state == 0:
+            # state:
+            # 0 - (default) normal;
+            # 1 - not supported;
+            pass
+        else:
+            # Строка описания собирается только для неисправных объектов
+            lld_info_str = "itemid={} name='{}' key='{}' error='{}'".format(d.itemid, d.name.encode('utf-8'),
+                                                                            d.key_.encode('utf-8'),
+                                                                            d.error.encode('utf-8'))
+            record = {'type': 'lld', 'id': d.itemid, 'name': d.name, 'key': d.key_, 'error': d.error}
+            check_report_broken(record, lld_info_str, known, broken, prefix, report)
+            return_value = False
+    # __________________________________________________________________________
+    # Проверка элементов данных
+    log.d1("Checking items: ...")
+    log.d1("...   total: {}".format(len(items)))
+    for i in items:
+        if i.status == 1:
+            # status:
+            # 0 - (default) enabled item;
+            # 1 - disabled item;
+            pass
+        elif i.state == 0:
+            # state:
+            # 0 - (default) normal;
+            # 1 - not supported;
+            pass
+        else:
+            item_info_str = "itemid={} name='{}' key='{}' error='{}'".format(i.itemid, i.name.encode('utf-8'),
+                                                                             i.key_.encode('utf-8'),
+                                                                             i.error.encode('utf-8'))
+            record = {'type': 'item', 'id': i.itemid, 'name': i.name, 'key': i.key_, 'error': i.error}
             # __________________________________________________________________
-            # https://www.zabbix.com/documentation/current/manual/api/reference/trigger/object
-            log.d1("Checking triggers: ...")
-            zabbix_triggers = zabbix_trigger_get(zabbix_server, int(h['hostid']))
-            log.d1("...   total: {}".format(len(zabbix_triggers)))
-            for t in zabbix_triggers:
-                trigger_info_str = "triggerid: {}, description: '{}', error: '{}'".format(t['triggerid'],
-                                                                                          t['description'],
-                                                                                          t['error'])
-                if int(t['status']) == 1:
-                    # status:
-                    # 0 - (default) enabled;
-                    # 1 - disabled;
-                    pass
-                elif int(t['state']) == 0:
-                    # state:
-                    # 0 - (default) trigger state is up to date;
-                    # 1 - current trigger state is unknown;
-                    pass
-                else:
-                    # __________________________________________________________
-                    # Исключение
-                    if list(filter(lambda x: t['error'].lower().find(x) > -1, _TRIGGER_EXCLUDE_ERRORS)) or \
-                            t['triggerid'] in config_job['exclude_trigger_ids'] or \
-                            (config_job['exclude_trigger_re'] and config_job['exclude_trigger_re'].search(
-                                t['description'])):
-                        log.d1("Skipped: {}".format(trigger_info_str))
-                    # __________________________________________________________
-                    # Интерактивное отключение
-                    elif config_job['interactive'] and kb_confirm("Disable trigger: {}".format(trigger_info_str)):
-                        data = {"triggerid": t['triggerid'], "status": 1}
-                        if zabbix_trigger_update(zabbix_server, data):
-                            log.o("Trigger disabled")
-                    # __________________________________________________________
-                    # Печать
-                    else:
-                        log.i("Broken: {}".format(trigger_info_str))
-                        return_value = False
-    # ==================================================================================================================
-    # ==================================================================================================================
-    # Удаление PID файла
-    if not fs_rm_file(pid_file_path):
-        log.e("Failed to delete PID file: '{}'".format(pid_file_path))
-        return_value = False
+            # Исключение
+            if config_job['exclude_items'].match(i.itemid, i.key_, i.error):
+                log.d1("Skipped :{}".format(item_info_str))
+                if report is not None:
+                    report(dict(record, excluded=True))
+            # __________________________________________________________________
+            # Отключение: подтверждение или правила --auto-disable
+            elif remediation is not None and (rollup is None or not i.templateid) and \
+                    remediation.select('item', i.itemid, i.key_, i.error, item_info_str):
+                pass
+            # __________________________________________________________________
+            # Печать
+            else:
+                check_report_broken(record, item_info_str, known, broken, prefix, report, rollup, i.templateid)
+                return_value = False
+    # __________________________________________________________________________
+    # https://www.zabbix.com/documentation/current/manual/api/reference/trigger/object
+    log.d1("Checking triggers: ...")
+    log.d1("...   total: {}".format(len(triggers)))
+    for t in triggers:
+        if t.status == 1:
+            # status:
+            # 0 - (default) enabled;
+            # 1 - disabled;
+            pass
+        elif t.state == 0:
+            # state:
+            # 0 - (default) trigger state is up to date;
+            # 1 - current trigger state is unknown;
+            pass
+        else:
+            trigger_info_str = "triggerid: {}, description: '{}', error: '{}'".format(t.triggerid, t.description,
+                                                                                      t.error)
+            record = {'type': 'trigger', 'id': t.triggerid, 'name': t.description, 'error': t.error}
+            # __________________________________________________________________
+            # Исключение
+            if config_job['exclude_triggers'].match(t.triggerid, t.description, t.error):
+                log.d1("Skipped: {}".format(trigger_info_str))
+                if report is not None:
+                    report(dict(record, excluded=True))
+            # __________________________________________________________________
+            # Отключение: подтверждение или правила --auto-disable
+            elif remediation is not None and (rollup is None or not t.templateid) and \
+                    remediation.select('trigger', t.triggerid, t.description, t.error, trigger_info_str):
+                pass
+            # __________________________________________________________________
+            # Печать
+            else:
+                check_report_broken(record, trigger_info_str, known, broken, prefix, report, rollup, t.templateid)
+                return_value = False
     # __________________________________________________________________________
     return return_value
 
 
-# ======================================================================================================================
-# Functions
-# ======================================================================================================================
+def check_report_broken(record, info_str, known, broken, prefix, report, rollup=None, templateid=0):
+    key = (record['type'], record['id'])
+    if broken is not None:
+        broken[key] = dict(record, text=info_str)
+    new = known is None or key not in known
+    if report is not None:
+        report(dict(record, new=new))
+    if not new:
+        log.d1("{}Still broken: {}".format(prefix, info_str))
+    elif rollup is not None and rollup(record, templateid):
+        log.d1("{}Broken (template): {}".format(prefix, info_str))
+    elif not reporter.enabled:
+        log.i("{}Broken: {}".format(prefix, info_str))
 
 
 # ======================================================================================================================
@@ -308,6 +1191,15 @@ def signal_handler_sigint(signum: int, frame):
     sys.exit(1)
 
 
+def signal_handler_daemon(signum: int, frame):
+    # Обработка выполняется в основном цикле после завершения текущей проверки
+    if hasattr(signal, 'SIGHUP') and signum == signal.SIGHUP:
+        _daemon_flags['reload'] = True
+    else:
+        _daemon_flags['stop'] = True
+    _daemon_wakeup.set()
+
+
 # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 if __name__ == '__main__':
     if os.name == 'nt':
@@ -324,6 +1216,7 @@ if __name__ == '__main__':
         windll.kernel32.SetConsoleScreenBufferSize(chandle, bufsize)
 
     # __________________________________________________________________________
+    multiprocessing.freeze_support()
     pid_file_path = os.path.join(tempfile.gettempdir(), os.path.basename(sys.argv[0]) + '.pid')
     rc = main()
     # __________________________________________________________________________